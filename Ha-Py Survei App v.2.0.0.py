@@ -1,19 +1,8 @@
-import tkinter as tk
-from tkinter import ttk, messagebox, filedialog, scrolledtext
-import sqlite3, os, re, uuid, math, hashlib
-from datetime import datetime
+import sqlite3, os, re, io, uuid, math, hashlib, threading, time, csv, json, sys, argparse, contextlib, subprocess
+from datetime import datetime, timezone
 from collections import deque
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import cm
-from reportlab.lib.enums import TA_CENTER
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
-from matplotlib.figure import Figure
-import matplotlib
-matplotlib.use('Agg')  # Untuk mode non-interaktif
+from concurrent.futures import ThreadPoolExecutor
+from xml.sax.saxutils import escape
 
 APP_TITLE = "Hap-Py Survei App"
 APP_VERSION = "1.0.0"
@@ -21,8 +10,132 @@ APP_VERSION = "1.0.0"
 EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
 PHONE_RE = re.compile(r'^[0-9+\-\s()]{11,15}$')
 
-def now_ts(): return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+# Kolom penilaian beserta nilai maksimumnya
+RATING_FIELDS = (('quality', 5), ('timeliness', 5), ('service', 5), ('overall', 10))
+UNKNOWN_LOCATION = 'Tidak diketahui'
+
+# Tkinter dan backend TkAgg baru dimuat oleh load_gui(), jadi CLI bisa jalan di server tanpa display
+tk = ttk = messagebox = filedialog = scrolledtext = None
+
+def load_gui():
+    global tk, ttk, messagebox, filedialog, scrolledtext
+    import tkinter as tk
+    from tkinter import ttk, messagebox, filedialog, scrolledtext
+
+# ReportLab dan matplotlib butuh beberapa detik untuk diimpor, padahal kebanyakan
+# pengguna tidak membuka Statistik/Export. Keduanya dimuat saat pertama dipakai.
+colors = A4 = cm = TA_CENTER = None
+SimpleDocTemplate = Paragraph = Spacer = PageBreak = getSampleStyleSheet = ParagraphStyle = None
+matplotlib = plt = Figure = FigureCanvasTkAgg = NavigationToolbar2Tk = None
+np = None  # NumPy opsional, hanya untuk RatingSnapshot
+WARM_IMPORTS = True  # muat keduanya di thread latar setelah login
+
+def load_reportlab():
+    global colors, A4, cm, TA_CENTER, SimpleDocTemplate, Paragraph, Spacer, PageBreak
+    global getSampleStyleSheet, ParagraphStyle
+    if ParagraphStyle is not None:
+        return
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+    from reportlab.lib.units import cm
+    from reportlab.lib.enums import TA_CENTER
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+def load_charts():
+    global matplotlib, plt, Figure, FigureCanvasTkAgg, NavigationToolbar2Tk
+    if NavigationToolbar2Tk is not None:
+        return
+    import matplotlib
+    matplotlib.use('Agg')  # Untuk mode non-interaktif
+    import matplotlib.pyplot as plt
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+
+def load_numpy():
+    global np
+    if np is None:
+        import numpy as np
+
+_warm_started = False
+
+def warm_imports():
+    """Mulai impor reportlab dan matplotlib di thread latar (sekali saja)"""
+    global _warm_started
+    if _warm_started or not WARM_IMPORTS:
+        return
+    _warm_started = True
+
+    def run():
+        try:
+            load_reportlab()
+            load_charts()
+        except ImportError:
+            pass  # dicoba lagi (dan error-nya ditampilkan) saat fitur dipakai
+    threading.Thread(target=run, name='warm-imports', daemon=True).start()
+
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+def now_ts(): return datetime.now().strftime(TS_FORMAT)
+
+# Kolom surveys.ts menyimpan waktu survey sebagai epoch detik, dengan jam dinding
+# pada kolom timestamp dibaca sebagai UTC (sama seperti strftime('%s') di SQLite),
+# jadi batas hari = kelipatan 86400 dan tidak bergantung zona waktu mesin.
+def to_epoch(value):
+    """int/float, datetime, date atau teks ISO ('YYYY-MM-DD[ HH:MM:SS]') -> epoch detik; None tetap None"""
+    if value is None or isinstance(value, (int, float)):
+        return None if value is None else int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.strip())
+    elif not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    return int(value.replace(tzinfo=timezone.utc).timestamp())
+
+def from_epoch(epoch):
+    return datetime.fromtimestamp(int(epoch), timezone.utc).strftime(TS_FORMAT)
+
+def location_key(name):
+    """Kunci normal lokasi: spasi dirapikan dan besar/kecil huruf diabaikan ('' = tidak diketahui)"""
+    return ' '.join(str(name or '').split()).casefold()
+
+def location_label(name):
+    return ' '.join(str(name or '').split()) or UNKNOWN_LOCATION
+
+def normalize_ts(text):
+    """Teks timestamp -> TS_FORMAT, atau None bila tidak bisa dibaca. Selain
+    'YYYY-MM-DD HH:MM:SS' diterima juga varian ISO ('YYYY-MM-DD', pemisah 'T');
+    zona waktu eksplisit dan tahun sebelum 1970 (ts <= 0) ditolak."""
+    text = str(text).strip()
+    try:
+        value = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if value.tzinfo is not None or value.year < 1970:
+        return None
+    if len(text) == 19 and text[10] == ' ':
+        return text  # sudah TS_FORMAT, tidak perlu strftime
+    return value.strftime(TS_FORMAT)
+
+def epoch_or_zero(text):
+    # Padanan Python dari EPOCH_SQL: teks yang tidak bisa dibaca menjadi 0
+    try:
+        return to_epoch(text) or 0
+    except (TypeError, ValueError):
+        return 0
+
 def gen_id(): return str(uuid.uuid4())
+
+# ID publik survey tetap teks UUID; di database UUID kanonis (huruf kecil, bertanda hubung)
+# disimpan sebagai BLOB 16 byte. ID lain (mis. dari file import) disimpan apa adanya,
+# jadi pemetaan bolak-balik selalu menghasilkan teks yang sama.
+CANONICAL_UUID_RE = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\Z')
+
+def pack_id(public_id):
+    if isinstance(public_id, str) and CANONICAL_UUID_RE.match(public_id):
+        return bytes.fromhex(public_id.replace('-', ''))
+    return public_id
+
+def unpack_id(value):
+    return str(uuid.UUID(bytes=value)) if isinstance(value, bytes) else value
 def hash_pw(p): return hashlib.sha256(p.encode('utf-8')).hexdigest()
 def valid_email(e): return bool(EMAIL_RE.match(e)) if e else True
 def valid_phone(p): return bool(PHONE_RE.match(p)) if p else True
@@ -30,15 +143,368 @@ def valid_phone(p): return bool(PHONE_RE.match(p)) if p else True
 # ==================================================
 # DATABASE
 # ==================================================
+class TimedConnection(sqlite3.Connection):
+    """Koneksi SQLite yang mencatat jumlah dan durasi query"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.query_count = 0
+        self.query_time = 0.0
+
+    def _timed(self, fn, *args):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.query_count += 1
+            self.query_time += time.perf_counter() - t0
+
+    def execute(self, *args):
+        return self._timed(super().execute, *args)
+
+    def executemany(self, *args):
+        return self._timed(super().executemany, *args)
+
+    def executescript(self, *args):
+        return self._timed(super().executescript, *args)
+
+class ConnectionPool:
+    """Satu koneksi persisten per thread, PRAGMA diatur sekali saat koneksi dibuka"""
+    def __init__(self, path, cache_kb=16384, cached_statements=256):
+        self.path = path
+        self.cache_kb = cache_kb
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conns = []
+        self.connect_count = 0
+        self.connect_time = 0.0
+
+    def get(self):
+        c = getattr(self._local, 'conn', None)
+        if c is not None:
+            return c
+        t0 = time.perf_counter()
+        # check_same_thread=False hanya agar close() bisa dipanggil dari thread utama;
+        # tiap koneksi tetap dipakai oleh satu thread saja
+        c = sqlite3.connect(self.path, factory=TimedConnection,
+                            cached_statements=self.cached_statements, check_same_thread=False)
+        c.row_factory = sqlite3.Row
+        c.execute("PRAGMA journal_mode=WAL")
+        c.execute("PRAGMA synchronous=NORMAL")
+        c.execute(f"PRAGMA cache_size=-{int(self.cache_kb)}")
+        c.execute("PRAGMA temp_store=MEMORY")
+        self._local.conn = c
+        with self._lock:
+            self._conns.append(c)
+            self.connect_count += 1
+            self.connect_time += time.perf_counter() - t0
+        return c
+
+    def stats(self):
+        with self._lock:
+            conns = list(self._conns)
+            result = {'connections': len(conns), 'connects': self.connect_count,
+                      'connect_time': self.connect_time}
+        result['queries'] = sum(c.query_count for c in conns)
+        result['query_time'] = sum(c.query_time for c in conns)
+        return result
+
+    def close(self):
+        with self._lock:
+            conns, self._conns = self._conns, []
+        for c in conns:
+            try:
+                c.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+# ------------------ Migrasi Skema ------------------
+# Versi skema disimpan di PRAGMA user_version. Migrasi ke-n menaikkan versi ke n;
+# tambahkan fungsi baru di akhir MIGRATIONS, jangan ubah migrasi yang sudah rilis.
+def index_sql(table, *columns, unique=False):
+    name = f"idx_{table}_{'_'.join(columns)}"
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    return f"CREATE {kind} IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+
+def _m001_survey_indexes(c):
+    for col in ('timestamp', 'owner_username', 'customer_location'):
+        c.execute(index_sql('surveys', col))
+
+FTS_COLUMNS = ('customer_name', 'customer_email', 'customer_location', 'comments')
+
+def _m002_survey_fts(c):
+    # FTS5 tidak selalu dikompilasi ke SQLite; tanpa FTS5 pencarian kembali ke LIKE
+    cols = ', '.join(FTS_COLUMNS)
+    new_vals = ', '.join(f"new.{col}" for col in FTS_COLUMNS)
+    old_vals = ', '.join(f"old.{col}" for col in FTS_COLUMNS)
+    try:
+        c.execute(f"""CREATE VIRTUAL TABLE IF NOT EXISTS surveys_fts USING fts5(
+            {cols}, content='surveys', tokenize='unicode61 remove_diacritics 2')""")
+    except sqlite3.OperationalError:
+        return
+    c.execute(f"""CREATE TRIGGER IF NOT EXISTS surveys_fts_ai AFTER INSERT ON surveys BEGIN
+        INSERT INTO surveys_fts(rowid, {cols}) VALUES (new.rowid, {new_vals});
+    END""")
+    c.execute(f"""CREATE TRIGGER IF NOT EXISTS surveys_fts_ad AFTER DELETE ON surveys BEGIN
+        INSERT INTO surveys_fts(surveys_fts, rowid, {cols}) VALUES ('delete', old.rowid, {old_vals});
+    END""")
+    c.execute(f"""CREATE TRIGGER IF NOT EXISTS surveys_fts_au AFTER UPDATE ON surveys BEGIN
+        INSERT INTO surveys_fts(surveys_fts, rowid, {cols}) VALUES ('delete', old.rowid, {old_vals});
+        INSERT INTO surveys_fts(rowid, {cols}) VALUES (new.rowid, {new_vals});
+    END""")
+    c.execute("INSERT INTO surveys_fts(surveys_fts) VALUES ('rebuild')")
+
+def _m003_keyset_index(c):
+    # (timestamp, id) menggantikan indeks timestamp tunggal untuk keyset pagination
+    c.execute(index_sql('surveys', 'timestamp', 'id'))
+    c.execute("DROP INDEX IF EXISTS idx_surveys_timestamp")
+
+# Epoch dari kolom timestamp teks; 0 bila tidak bisa dibaca agar urutan (ts, id) tetap total
+EPOCH_SQL = "COALESCE(CAST(strftime('%s', {0}) AS INTEGER), 0)"
+
+def _m005_epoch_timestamps(c):
+    # Kolom ts (epoch) berindeks untuk urutan, keyset dan query rentang waktu. Kolom timestamp
+    # teks tetap ada untuk tampilan dan kompatibilitas; penulis di luar aplikasi yang tidak
+    # mengisi ts ditangani trigger (aplikasi sendiri selalu mengisinya, jadi trigger tidak jalan).
+    if 'ts' not in [r[1] for r in c.execute("PRAGMA table_info(surveys)")]:
+        c.execute("ALTER TABLE surveys ADD COLUMN ts INTEGER")
+    # Trigger UPDATE (FTS, ringkasan) tidak bergantung pada ts; lewati selama pengisian awal
+    triggers = c.execute("SELECT sql FROM sqlite_master WHERE type='trigger' AND name IN "
+                         "('surveys_fts_au', 'surveys_stats_au')").fetchall()
+    c.execute("DROP TRIGGER IF EXISTS surveys_fts_au")
+    c.execute("DROP TRIGGER IF EXISTS surveys_stats_au")
+    c.execute(f"UPDATE surveys SET ts = {EPOCH_SQL.format('timestamp')}")
+    for (trigger_sql,) in triggers:
+        c.execute(trigger_sql)
+    c.execute(index_sql('surveys', 'ts', 'id'))
+    c.execute("DROP INDEX IF EXISTS idx_surveys_timestamp_id")
+    c.execute(f"""CREATE TRIGGER IF NOT EXISTS surveys_ts_ai AFTER INSERT ON surveys WHEN new.ts IS NULL BEGIN
+        UPDATE surveys SET ts = {EPOCH_SQL.format('new.timestamp')} WHERE rowid = new.rowid;
+    END""")
+    c.execute(f"""CREATE TRIGGER IF NOT EXISTS surveys_ts_au AFTER UPDATE OF timestamp ON surveys
+        WHEN new.ts IS NOT {EPOCH_SQL.format('new.timestamp')} BEGIN
+        UPDATE surveys SET ts = {EPOCH_SQL.format('new.timestamp')} WHERE rowid = new.rowid;
+    END""")
+
+SURVEY_TABLE_SQL = '''
+    CREATE TABLE {0} (
+        pk INTEGER PRIMARY KEY,
+        id BLOB NOT NULL UNIQUE,
+        timestamp TEXT NOT NULL,
+        customer_name TEXT NOT NULL,
+        customer_email TEXT,
+        customer_phone TEXT,
+        customer_gender TEXT,
+        customer_location TEXT,
+        quality INTEGER,
+        timeliness INTEGER,
+        service INTEGER,
+        overall INTEGER,
+        comments TEXT,
+        owner_username TEXT DEFAULT '',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        ts INTEGER
+    )
+'''
+
+def _m006_integer_keys(c):
+    # surveys dibangun ulang dengan kunci INTEGER PRIMARY KEY (pk = rowid lama, jadi indeks FTS
+    # tetap cocok dan rowid tidak lagi berubah oleh VACUUM) dan id publik sebagai BLOB 16 byte.
+    # Indeks sekunder kini membawa pk 8 byte, bukan teks UUID 36 byte; (ts) menggantikan (ts, id).
+    c.create_function('pack_id', 1, pack_id, deterministic=True)
+    triggers = [r[0] for r in c.execute(
+        "SELECT sql FROM sqlite_master WHERE type='trigger' AND tbl_name='surveys'")]
+    indexes = [r[0] for r in c.execute(
+        "SELECT sql FROM sqlite_master WHERE type='index' AND tbl_name='surveys' AND sql IS NOT NULL "
+        "AND name != 'idx_surveys_ts_id'")]
+    cols = ', '.join(SimpleDB.SURVEY_COLUMNS[1:] + ('created_at', 'ts'))
+    c.execute(SURVEY_TABLE_SQL.format('surveys_new'))
+    c.execute(f"INSERT INTO surveys_new (pk, id, {cols}) SELECT rowid, pack_id(id), {cols} FROM surveys ORDER BY rowid")
+    c.execute("DROP TABLE surveys")
+    c.execute("ALTER TABLE surveys_new RENAME TO surveys")
+    for sql in indexes + [index_sql('surveys', 'ts')] + triggers:
+        c.execute(sql)
+
+LOCATION_KEY_SQL = "COALESCE(NULLIF(TRIM({0}.customer_location), ''), '" + UNKNOWN_LOCATION + "')"
+# Kunci baris survey_stats_location: (kolom, ekspresi SQL atas baris surveys). Sejak migrasi 7
+# berupa id lokasi kanonis; baris tanpa location_id (ditulis di luar aplikasi) masuk "tidak diketahui".
+LEGACY_LOCATION_SUMMARY = ('location', LOCATION_KEY_SQL)
+LOCATION_SUMMARY = ('location_id', "COALESCE({0}.location_id, (SELECT id FROM locations WHERE key = ''))")
+# Kunci baris survey_stats_daily. Sejak migrasi 8 diambil dari ts (UTC, sama dengan tren yang
+# difilter); baris dengan ts <= 0 (timestamp tidak terbaca) tidak masuk ringkasan harian.
+LEGACY_DAY_SUMMARY = "substr({0}.timestamp, 1, 10)"
+DAY_SUMMARY = "CASE WHEN {0}.ts > 0 THEN date({0}.ts, 'unixepoch') END"
+
+def _summary_upsert(table, key_col, key_sql, row, sign):
+    # Tambah (sign=+1) atau kurangi (sign=-1) satu survey dari baris ringkasan
+    cols = ['n'] + [f"{f}_{k}" for f, _ in RATING_FIELDS for k in ('sum', 'sq')]
+    vals = [str(sign)] + [v for f, _ in RATING_FIELDS
+                          for v in (f"{sign}*COALESCE({row}.{f},0)", f"{sign}*COALESCE({row}.{f},0)*COALESCE({row}.{f},0)")]
+    updates = ', '.join(f"{c} = {c} + excluded.{c}" for c in cols)
+    return (f"INSERT INTO {table} ({key_col}, {', '.join(cols)}) SELECT {key_sql}, {', '.join(vals)} "
+            f"WHERE {key_sql} IS NOT NULL ON CONFLICT({key_col}) DO UPDATE SET {updates};")
+
+def _summary_statements(row, sign, location=LOCATION_SUMMARY, day=DAY_SUMMARY):
+    key_col, key_sql = location
+    loc = key_sql.format(row)
+    stmts = [_summary_upsert('survey_stats_location', key_col, loc, row, sign),
+             _summary_upsert('survey_stats_daily', 'day', day.format(row), row, sign)]
+    for f, _ in RATING_FIELDS:
+        stmts.append(f"INSERT INTO survey_stats_rating (field, value, n) SELECT '{f}', {row}.{f}, {sign} "
+                     f"WHERE {row}.{f} IS NOT NULL ON CONFLICT(field, value) DO UPDATE SET n = n + excluded.n;")
+    if sign < 0:
+        stmts.append(f"DELETE FROM survey_stats_location WHERE {key_col} = {loc} AND n <= 0;")
+        stmts.append(f"DELETE FROM survey_stats_daily WHERE day = {day.format(row)} AND n <= 0;")
+        stmts.append("DELETE FROM survey_stats_rating WHERE n <= 0;")
+    return '\n        '.join(stmts)
+
+def _m004_summary_tables(c):
+    # Agregat berjalan (count, sum, sum kuadrat) per lokasi dan per hari, plus histogram
+    # nilai per penilaian untuk min/max; semuanya dijaga trigger pada tabel surveys
+    sums = ', '.join(f"{f}_{k} INTEGER NOT NULL DEFAULT 0" for f, _ in RATING_FIELDS for k in ('sum', 'sq'))
+    c.execute(f"CREATE TABLE IF NOT EXISTS survey_stats_location (location TEXT PRIMARY KEY, n INTEGER NOT NULL DEFAULT 0, {sums})")
+    c.execute(f"CREATE TABLE IF NOT EXISTS survey_stats_daily (day TEXT PRIMARY KEY, n INTEGER NOT NULL DEFAULT 0, {sums})")
+    c.execute("""CREATE TABLE IF NOT EXISTS survey_stats_rating (
+        field TEXT NOT NULL, value INTEGER NOT NULL, n INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (field, value))""")
+    
+    _create_summary_triggers(c, LEGACY_LOCATION_SUMMARY, LEGACY_DAY_SUMMARY)
+    rebuild_summary_tables(c, LEGACY_LOCATION_SUMMARY, LEGACY_DAY_SUMMARY)
+
+def _create_summary_triggers(c, location=LOCATION_SUMMARY, day=DAY_SUMMARY):
+    c.execute(f"""CREATE TRIGGER IF NOT EXISTS surveys_stats_ai AFTER INSERT ON surveys BEGIN
+        {_summary_statements('new', 1, location, day)}
+    END""")
+    c.execute(f"""CREATE TRIGGER IF NOT EXISTS surveys_stats_ad AFTER DELETE ON surveys BEGIN
+        {_summary_statements('old', -1, location, day)}
+    END""")
+    c.execute(f"""CREATE TRIGGER IF NOT EXISTS surveys_stats_au AFTER UPDATE ON surveys BEGIN
+        {_summary_statements('old', -1, location, day)}
+        {_summary_statements('new', 1, location, day)}
+    END""")
+
+def add_to_summary_tables(c, where='1', params=(), location=LOCATION_SUMMARY, day=DAY_SUMMARY):
+    """Tambahkan agregat baris surveys yang memenuhi where ke tabel ringkasan (berbasis set)"""
+    cols = ['n'] + [f"{f}_{k}" for f, _ in RATING_FIELDS for k in ('sum', 'sq')]
+    aggs = ', '.join(f"SUM(COALESCE({f},0)), SUM(COALESCE({f},0)*COALESCE({f},0))" for f, _ in RATING_FIELDS)
+    updates = ', '.join(f"{col} = {col} + excluded.{col}" for col in cols)
+    for table, key_col, key_sql in (('survey_stats_location', location[0], location[1].format('surveys')),
+                                    ('survey_stats_daily', 'day', day.format('surveys'))):
+        c.execute(f"""INSERT INTO {table} ({key_col}, {', '.join(cols)})
+            SELECT {key_sql}, COUNT(*), {aggs} FROM surveys WHERE {where} GROUP BY 1 HAVING {key_sql} IS NOT NULL
+            ON CONFLICT({key_col}) DO UPDATE SET {updates}""", params)
+    for f, _ in RATING_FIELDS:
+        c.execute(f"""INSERT INTO survey_stats_rating (field, value, n)
+            SELECT '{f}', {f}, COUNT(*) FROM surveys WHERE ({where}) AND {f} IS NOT NULL GROUP BY {f}
+            ON CONFLICT(field, value) DO UPDATE SET n = n + excluded.n""", params)
+
+def rebuild_summary_tables(c, location=LOCATION_SUMMARY, day=DAY_SUMMARY):
+    """Hitung ulang seluruh tabel ringkasan dari surveys"""
+    c.execute("DELETE FROM survey_stats_location")
+    c.execute("DELETE FROM survey_stats_daily")
+    c.execute("DELETE FROM survey_stats_rating")
+    add_to_summary_tables(c, location=location, day=day)
+
+def resolve_locations(c, names):
+    """{teks lokasi: id lokasi kanonis}; kunci yang belum dikenal ditambahkan ke locations
+    dengan teks itu (spasi dirapikan) sebagai nama tampilan"""
+    ids = {}
+    for name in names:
+        if name in ids:
+            continue
+        key = location_key(name)
+        r = c.execute("SELECT COALESCE(canonical_id, id) FROM locations WHERE key = ?", (key,)).fetchone()
+        if r is None:
+            r = (c.execute("INSERT INTO locations (key, name) VALUES (?, ?)", (key, location_label(name))).lastrowid,)
+        ids[name] = r[0]
+    return ids
+
+def assign_locations(c, where="location_id IS NULL"):
+    """Isi surveys.location_id dari customer_location untuk baris yang memenuhi where;
+    ejaan terbanyak dari tiap kunci baru menjadi nama tampilannya. Hasil: jumlah baris."""
+    raw = c.execute(f"SELECT customer_location, COUNT(*) FROM surveys WHERE {where} "
+                    f"GROUP BY customer_location ORDER BY COUNT(*) DESC").fetchall()
+    ids = resolve_locations(c, [name for name, _ in raw])
+    c.executemany(f"UPDATE surveys SET location_id = ? WHERE ({where}) AND customer_location IS ?",
+                  [(ids[name], name) for name, _ in raw])
+    return sum(n for _, n in raw)
+
+def _m007_location_dimension(c):
+    # Dimensi lokasi dengan kunci normal (location_key). Varian salah ketik yang digabung
+    # tetap punya baris dengan canonical_id ke lokasi tujuan, jadi input berikutnya langsung
+    # terpetakan; surveys.location_id selalu menunjuk lokasi kanonis. Teks customer_location
+    # asli tetap disimpan untuk tampilan, pencarian FTS dan export.
+    c.execute("""CREATE TABLE IF NOT EXISTS locations (
+        id INTEGER PRIMARY KEY,
+        key TEXT NOT NULL UNIQUE,
+        name TEXT NOT NULL,
+        canonical_id INTEGER REFERENCES locations(id))""")
+    c.execute("INSERT OR IGNORE INTO locations (key, name) VALUES ('', ?)", (UNKNOWN_LOCATION,))
+    if 'location_id' not in [r[1] for r in c.execute("PRAGMA table_info(surveys)")]:
+        c.execute("ALTER TABLE surveys ADD COLUMN location_id INTEGER REFERENCES locations(id)")
+    # Trigger ringkasan diganti di bawah; trigger FTS tidak bergantung pada location_id
+    fts_au = c.execute("SELECT sql FROM sqlite_master WHERE name = 'surveys_fts_au'").fetchone()
+    for name in ('surveys_fts_au', 'surveys_stats_ai', 'surveys_stats_ad', 'surveys_stats_au'):
+        c.execute(f"DROP TRIGGER IF EXISTS {name}")
+    assign_locations(c)
+    if fts_au:
+        c.execute(fts_au[0])
+    c.execute("DROP INDEX IF EXISTS idx_surveys_customer_location")
+    c.execute(index_sql('surveys', 'location_id'))
+    
+    sums = ', '.join(f"{f}_{k} INTEGER NOT NULL DEFAULT 0" for f, _ in RATING_FIELDS for k in ('sum', 'sq'))
+    c.execute("DROP TABLE IF EXISTS survey_stats_location")
+    c.execute(f"CREATE TABLE survey_stats_location (location_id INTEGER PRIMARY KEY, n INTEGER NOT NULL DEFAULT 0, {sums})")
+    _create_summary_triggers(c, day=LEGACY_DAY_SUMMARY)
+    rebuild_summary_tables(c, day=LEGACY_DAY_SUMMARY)
+
+def _m008_daily_summary_epoch(c):
+    # survey_stats_daily dikunci dari ts, bukan awalan teks timestamp: tren tanpa filter
+    # (dari ringkasan) dan dengan filter (langsung dari surveys) kini memakai hari yang sama
+    for name in ('surveys_stats_ai', 'surveys_stats_ad', 'surveys_stats_au'):
+        c.execute(f"DROP TRIGGER IF EXISTS {name}")
+    _create_summary_triggers(c)
+    rebuild_summary_tables(c)
+
+MIGRATIONS = [
+    _m001_survey_indexes,
+    _m002_survey_fts,
+    _m003_keyset_index,
+    _m004_summary_tables,
+    _m005_epoch_timestamps,
+    _m006_integer_keys,
+    _m007_location_dimension,
+    _m008_daily_summary_epoch,
+]
+
+def run_migrations(c):
+    version = c.execute("PRAGMA user_version").fetchone()[0]
+    for n, migrate in enumerate(MIGRATIONS[version:], start=version + 1):
+        try:
+            c.execute("BEGIN")
+            migrate(c)
+            c.execute(f"PRAGMA user_version={n}")
+            c.commit()
+        except Exception:
+            c.rollback()
+            raise
+    return len(MIGRATIONS)
+
 class SimpleDB:
     def __init__(self, path='survey_app.db'):
         self.path = path
+        self.pool = ConnectionPool(path)
         self._init_db()
 
     def conn(self):
-        c = sqlite3.connect(self.path)
-        c.row_factory = sqlite3.Row
-        return c
+        return self.pool.get()
+
+    def timings(self):
+        return self.pool.stats()
+
+    def close(self):
+        self.pool.close()
 
     def _init_db(self):
         with self.conn() as c:
@@ -76,6 +542,9 @@ class SimpleDB:
                 c.execute("INSERT INTO users (username,password,full_name,is_admin) VALUES (?,?,?,?)",
                          ('admin', hash_pw('admin123'), 'Administrator', 1))
             c.commit()
+            run_migrations(c)
+            self.has_fts = c.execute(
+                "SELECT 1 FROM sqlite_master WHERE name='surveys_fts'").fetchone() is not None
 
     def authenticate(self, username, password):
         hp = hash_pw(password)
@@ -97,222 +566,1963 @@ class SimpleDB:
 
     def save_survey(self, s):
         with self.conn() as c:
+            location_id = resolve_locations(c, [s['customer_location']])[s['customer_location']]
             c.execute('''
                 INSERT INTO surveys
                 (id,timestamp,customer_name,customer_email,customer_phone,
                  customer_gender,customer_location,quality,timeliness,
-                 service,overall,comments,owner_username)
-                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)
-            ''', (s['id'], s['timestamp'], s['customer_name'], s['customer_email'],
+                 service,overall,comments,owner_username,ts,location_id)
+                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+            ''', (pack_id(s['id']), s['timestamp'], s['customer_name'], s['customer_email'],
                   s['customer_phone'], s['customer_gender'], s['customer_location'],
                   s['quality'], s['timeliness'], s['service'], s['overall'],
-                  s['comments'], s['owner_username']))
+                  s['comments'], s['owner_username'], epoch_or_zero(s['timestamp']), location_id))
             c.commit()
             return True
 
-    def get_all_surveys(self):
-        with self.conn() as c:
-            return [dict(r) for r in c.execute("SELECT * FROM surveys ORDER BY timestamp DESC").fetchall()]
-                
+    SURVEY_COLUMNS = ('id', 'timestamp', 'customer_name', 'customer_email', 'customer_phone',
+                      'customer_gender', 'customer_location', 'quality', 'timeliness',
+                      'service', 'overall', 'comments', 'owner_username')
+    # Trigger per baris yang dilewati saat insert massal; efeknya diterapkan sekali per batch
+    BULK_SUSPENDED_TRIGGERS = ('surveys_fts_ai', 'surveys_stats_ai')
+
+    def bulk_insert_surveys(self, rows):
+        """Sisipkan banyak survey dalam satu transaksi dengan executemany.
+        Hasil (jumlah_masuk, [(indeks, pesan), ...]). Id ganda disaring lebih dulu dengan satu
+        query; bila masih ada baris yang ditolak, seluruh batch dibatalkan lalu diulang per baris."""
+        rows = list(rows)
+        try:
+            return self._bulk_insert(rows, rowwise=False)
+        except sqlite3.IntegrityError:
+            return self._bulk_insert(rows, rowwise=True)
+
+    def _duplicate_ids(self, c, ids):
+        # {indeks: pesan} untuk id yang sudah ada di tabel atau muncul dua kali dalam batch
+        existing = set()
+        for i in range(0, len(ids), 500):
+            part = ids[i:i + 500]
+            existing.update(r[0] for r in c.execute(
+                f"SELECT id FROM surveys WHERE id IN ({','.join('?' * len(part))})", part))
+        duplicates, seen = {}, set()
+        for i, key in enumerate(ids):
+            if key in existing or key in seen:
+                duplicates[i] = "UNIQUE constraint failed: surveys.id"
+            seen.add(key)
+        return duplicates
+
+    def _bulk_insert(self, rows, rowwise):
+        # ts dihitung SQLite dari parameter timestamp (?2), tanpa parsing per baris di Python
+        cols = self.SURVEY_COLUMNS + ('location_id', 'ts')
+        values = [f"?{n}" for n in range(1, len(cols))] + [EPOCH_SQL.format('?2')]
+        sql = f"INSERT INTO surveys ({','.join(cols)}) VALUES ({','.join(values)})"
+        c = self.conn()
+        try:
+            c.execute("BEGIN")
+            # SURVEY_COLUMNS diawali id
+            ids = [pack_id(r.get('id')) for r in rows]
+            failed = self._duplicate_ids(c, ids)
+            keep = [i for i in range(len(rows)) if i not in failed]
+            locations = resolve_locations(c, [rows[i].get('customer_location') for i in keep])
+            rest = self.SURVEY_COLUMNS[1:]
+            params = [(ids[i], *[rows[i].get(col) for col in rest], locations[rows[i].get('customer_location')])
+                      for i in keep]
+            start = c.execute("SELECT COALESCE(MAX(rowid), 0) FROM surveys").fetchone()[0]
+            triggers = c.execute(
+                f"SELECT name, sql FROM sqlite_master WHERE type='trigger' AND name IN "
+                f"({','.join('?' * len(self.BULK_SUSPENDED_TRIGGERS))})", self.BULK_SUSPENDED_TRIGGERS).fetchall()
+            for name, _ in triggers:
+                c.execute(f"DROP TRIGGER {name}")
+            inserted = len(params)
+            if rowwise:
+                for i, p in zip(keep, params):
+                    try:
+                        c.execute(sql, p)
+                    except sqlite3.IntegrityError as e:
+                        failed[i] = str(e)
+                        inserted -= 1
+            else:
+                c.executemany(sql, params)
+            self._bulk_catch_up(c, start, [name for name, _ in triggers])
+            for _, trigger_sql in triggers:
+                c.execute(trigger_sql)
+            c.commit()
+        except Exception:
+            c.rollback()
+            raise
+        return inserted, sorted(failed.items())
+
+    def _bulk_catch_up(self, c, start_rowid, suspended):
+        # Terapkan efek trigger yang dilewati untuk baris dengan rowid > start_rowid
+        if 'surveys_fts_ai' in suspended:
+            cols = ', '.join(FTS_COLUMNS)
+            c.execute(f"INSERT INTO surveys_fts(rowid, {cols}) SELECT rowid, {cols} FROM surveys WHERE rowid > ?",
+                      (start_rowid,))
+        if 'surveys_stats_ai' in suspended:
+            add_to_summary_tables(c, "rowid > ?", (start_rowid,))
+
+    @staticmethod
+    def survey_row(r):
+        """dict survey dari sqlite3.Row, dengan id dikembalikan ke bentuk publiknya"""
+        row = dict(r)
+        row['id'] = unpack_id(row['id'])
+        return row
+
     def update_survey(self, sid, s):
         with self.conn() as c:
+            location = s.get('customer_location', '')
             c.execute('''UPDATE surveys SET
                 timestamp=?, customer_name=?, customer_email=?, customer_phone=?,
                 customer_gender=?, customer_location=?, quality=?, timeliness=?,
-                service=?, overall=?, comments=? WHERE id=?
+                service=?, overall=?, comments=?, ts=?, location_id=? WHERE id=?
             ''', (s['timestamp'], s['customer_name'], s['customer_email'], s['customer_phone'],
-                  s.get('customer_gender',''), s.get('customer_location',''),
-                  s['quality'], s['timeliness'], s['service'], s['overall'], s.get('comments',''), sid))
+                  s.get('customer_gender',''), location,
+                  s['quality'], s['timeliness'], s['service'], s['overall'], s.get('comments',''),
+                  epoch_or_zero(s['timestamp']), resolve_locations(c, [location])[location], pack_id(sid)))
             c.commit()
             return True
 
     def delete_survey(self, sid):
         with self.conn() as c:
-            cur = c.execute("DELETE FROM surveys WHERE id=?", (sid,))
+            cur = c.execute("DELETE FROM surveys WHERE id=?", (pack_id(sid),))
             c.commit()
             return cur.rowcount > 0
 
-    def search_surveys(self, keyword):
+    @staticmethod
+    def fts_query(keyword):
+        """Ubah kata kunci bebas menjadi query FTS5: tiap kata dicocokkan sebagai prefiks"""
+        terms = re.findall(r'\w+', keyword or '')
+        return ' '.join(f'"{t}"*' for t in terms) or None
+
+    def search_surveys(self, keyword, ranked=True, limit=None):
+        """Survey yang cocok dengan kata kunci; ranked: paling relevan dulu, selain itu terbaru dulu"""
+        return self.query_surveys(keyword, limit=limit, ranked=ranked)
+
+    FILTER_COLUMNS = ('pk', 'id', 'owner_username', 'customer_location', 'location_id', 'customer_gender',
+                      'quality', 'timeliness', 'service', 'overall')
+
+    def _filter_sql(self, term='', filters=None):
+        """Bangun klausa WHERE dari kata kunci pencarian dan filter kolom {kolom: nilai | [nilai, ...]}.
+        Filter khusus 'period': (awal, akhir) memilih awal <= waktu < akhir (salah satunya boleh None)
+        sebagai range scan pada indeks (ts, id). customer_location dicocokkan lewat kunci normal
+        di tabel locations, jadi varian ejaan yang sudah digabung ikut terpilih."""
+        clauses, params = [], []
+        term = (term or '').strip()
+        if term:
+            match = self.fts_query(term) if self.has_fts else None
+            if match:
+                clauses.append("surveys.rowid IN (SELECT rowid FROM surveys_fts WHERE surveys_fts MATCH ?)")
+                params.append(match)
+            else:
+                clauses.append("(" + " OR ".join(f"{col} LIKE ?" for col in FTS_COLUMNS) + ")")
+                params.extend([f"%{term}%"] * len(FTS_COLUMNS))
+        for col, value in (filters or {}).items():
+            if col == 'period':
+                for op, bound in zip(('>=', '<'), value):
+                    if bound is not None:
+                        clauses.append(f"ts {op} ?")
+                        params.append(to_epoch(bound))
+                continue
+            if col not in self.FILTER_COLUMNS:
+                raise ValueError(f"Kolom filter tidak dikenal: {col}")
+            if col == 'customer_location':
+                names = list(value) if isinstance(value, (list, tuple, set)) else [value]
+                clauses.append(f"location_id IN (SELECT COALESCE(canonical_id, id) FROM locations "
+                               f"WHERE key IN ({','.join('?' * len(names))}))")
+                params.extend(location_key(n) for n in names)
+                continue
+            if col == 'id':
+                value = [pack_id(v) for v in value] if isinstance(value, (list, tuple, set)) else pack_id(value)
+            if isinstance(value, (list, tuple, set)):
+                value = list(value)
+                clauses.append(f"{col} IN ({','.join('?' * len(value))})")
+                params.extend(value)
+            else:
+                clauses.append(f"{col} = ?")
+                params.append(value)
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        return where, params
+
+    def query_surveys(self, term='', filters=None, limit=None, ranked=False):
+        """Survey yang cocok dengan kata kunci + filter, terbaru dulu; penyaringan dilakukan di SQLite.
+        filters mengikuti _filter_sql, termasuk {'period': (awal, akhir)} untuk rentang waktu.
+        ranked: dengan kata kunci dan FTS5, paling relevan (bm25) dulu."""
+        where, params = self._filter_sql(term, filters)
+        source, order = "surveys", "ts DESC, pk DESC"
+        match = self.fts_query(term) if ranked and self.has_fts else None
+        if match:
+            # rank FTS5 (bm25) diambil sekali untuk semua baris yang cocok, lalu di-join lewat pk
+            source = ("surveys JOIN (SELECT rowid AS fts_pk, rank AS fts_rank FROM surveys_fts "
+                      "WHERE surveys_fts MATCH ?) ON fts_pk = surveys.pk")
+            order = f"fts_rank, {order}"
+            params.insert(0, match)
+        limit_sql = f" LIMIT {int(limit)}" if limit else ""
+        with self.conn() as c:
+            cursor = c.execute(f"SELECT surveys.* FROM {source}{where} ORDER BY {order}{limit_sql}", params)
+            return [self.survey_row(r) for r in cursor.fetchall()]
+
+    PAGE_SIZE = 200
+
+    def get_surveys_page(self, cursor=None, limit=PAGE_SIZE, term='', filters=None, records=False):
+        """Satu halaman survey (terbaru dulu) dengan keyset pagination.
+        cursor = (ts, pk) baris terakhir halaman sebelumnya; hasil (rows, cursor berikutnya atau None).
+        records=True memberi SurveyRecord ringkas (komentar dimuat saat dibutuhkan) alih-alih dict."""
+        where, params = self._filter_sql(term, filters)
+        if cursor:
+            where += (" AND " if where else " WHERE ") + "(ts, pk) < (?, ?)"
+            params += list(cursor)
+        cols = SurveyRecord.SELECT if records else "*"
+        with self.conn() as c:
+            result = c.execute(
+                f"SELECT {cols} FROM surveys{where} ORDER BY ts DESC, pk DESC LIMIT ?", params + [int(limit)])
+            if records:
+                rows = [SurveyRecord(self, *r) for r in result]
+            else:
+                rows = [self.survey_row(r) for r in result]
+        next_cursor = (rows[-1]['ts'], rows[-1]['pk']) if len(rows) == limit else None
+        return rows, next_cursor
+
+    def get_surveys_at(self, offset, limit=PAGE_SIZE, term='', filters=None, records=False):
+        """Halaman survey mulai baris ke-offset (terbaru dulu), untuk lompatan jauh tanpa memuat
+        baris di depannya. Posisi dicari dengan OFFSET pada indeks (ts) saja (tanpa membaca
+        baris tabel), lalu halamannya diambil dengan keyset seperti get_surveys_page."""
+        cursor = None
+        if offset > 0:
+            where, params = self._filter_sql(term, filters)
+            with self.conn() as c:
+                r = c.execute(f"SELECT ts, pk FROM surveys{where} ORDER BY ts DESC, pk DESC LIMIT 1 OFFSET ?",
+                              params + [int(offset) - 1]).fetchone()
+            if r is None:
+                return [], None
+            cursor = (r[0], r[1])
+        return self.get_surveys_page(cursor, limit, term, filters, records)
+
+    def stats_groups(self, term='', filters=None):
+        """Satu agregasi SQL per lokasi: (lokasi, jumlah, ts_awal, ts_akhir,
+        lalu untuk tiap RATING_FIELDS: sum, sum kuadrat, min, max)"""
+        where, params = self._filter_sql(term, filters)
+        aggs = ", ".join(f"SUM({f}), SUM({f}*{f}), MIN({f}), MAX({f})" for f, _ in RATING_FIELDS)
+        names = self.location_names()
+        with self.conn() as c:
+            return [(names.get(r[0], UNKNOWN_LOCATION),) + tuple(r[1:]) for r in c.execute(f'''
+                SELECT location_id, COUNT(*), datetime(MIN(NULLIF(ts, 0)), 'unixepoch'),
+                       datetime(MAX(NULLIF(ts, 0)), 'unixepoch'), {aggs}
+                FROM surveys{where} GROUP BY location_id
+            ''', params)]
+
+    def summary_groups(self, by_id=False):
+        """Baris agregat per lokasi dari tabel ringkasan, format sama dengan stats_groups
+        (ts dan min/max per lokasi tidak disimpan, jadi None). by_id: kolom pertama
+        berisi id lokasi, bukan nama tampilan."""
+        cols = ', '.join(f"{f}_sum, {f}_sq, NULL, NULL" for f, _ in RATING_FIELDS)
+        names = {} if by_id else self.location_names()
+        with self.conn() as c:
+            return [(r[0] if by_id else names.get(r[0], UNKNOWN_LOCATION),) + tuple(r[1:]) for r in c.execute(
+                f"SELECT location_id, n, NULL, NULL, {cols} FROM survey_stats_location WHERE n > 0")]
+
+    def location_names(self):
+        """{id lokasi: nama tampilan}"""
+        with self.conn() as c:
+            return dict(c.execute("SELECT id, name FROM locations"))
+
+    def list_locations(self):
+        """Lokasi kanonis yang punya survey, terbanyak dulu: [(nama, jumlah survey, [nama varian yang digabung])].
+        Baris "tidak diketahui" bawaan migrasi dan lokasi yang surveynya sudah habis tidak ikut."""
+        with self.conn() as c:
+            variants = {}
+            for canonical_id, name in c.execute(
+                    "SELECT canonical_id, name FROM locations WHERE canonical_id IS NOT NULL ORDER BY name"):
+                variants.setdefault(canonical_id, []).append(name)
+            return [(name, n, variants.get(lid, [])) for lid, name, n in c.execute('''
+                SELECT l.id, l.name, s.n FROM locations l
+                JOIN survey_stats_location s ON s.location_id = l.id
+                WHERE l.canonical_id IS NULL AND s.n > 0 ORDER BY s.n DESC, l.name
+            ''')]
+
+    def merge_locations(self, target, variants):
+        """Gabungkan varian lokasi (mis. salah ketik "Madiunn") ke target: survey varian dipindah
+        ke target dan kunci varian tetap tercatat sebagai alias, jadi input berikutnya ikut
+        terpetakan. Hasil: jumlah survey yang dipindah."""
+        c = self.conn()
+        try:
+            c.execute("BEGIN")
+            target_id = resolve_locations(c, [target])[target]
+            moved = 0
+            for name in variants:
+                key = location_key(name)
+                r = c.execute("SELECT COALESCE(canonical_id, id) FROM locations WHERE key = ?", (key,)).fetchone()
+                if r is None:
+                    c.execute("INSERT INTO locations (key, name, canonical_id) VALUES (?, ?, ?)",
+                              (key, location_label(name), target_id))
+                    continue
+                if r[0] == target_id:
+                    continue
+                # Trigger surveys_stats_au memindahkan jumlah/sum ringkasan ke lokasi target
+                moved += c.execute("UPDATE surveys SET location_id = ? WHERE location_id = ?",
+                                   (target_id, r[0])).rowcount
+                c.execute("UPDATE locations SET canonical_id = ? WHERE id = ? OR canonical_id = ?",
+                          (target_id, r[0], r[0]))
+            c.commit()
+        except Exception:
+            c.rollback()
+            raise
+        return moved
+
+    def rating_extremes(self):
+        """{field: (min, max)} dari histogram nilai penilaian"""
+        with self.conn() as c:
+            return {r[0]: (r[1], r[2]) for r in c.execute(
+                "SELECT field, MIN(value), MAX(value) FROM survey_stats_rating WHERE n > 0 GROUP BY field")}
+
+    # Ember waktu untuk analisis tren: ekspresi SQL atas kolom day (YYYY-MM-DD)
+    # dan jumlah ember bawaan untuk rata-rata bergulir
+    TREND_BUCKETS = {
+        'day': ("day", 7),
+        'week': ("date(day, '-6 days', 'weekday 1')", 4),  # Senin awal minggu
+        'month': ("substr(day, 1, 7) || '-01'", 3),
+    }
+
+    def trend(self, bucket='week', window=None, term='', filters=None):
+        """Tren per ember waktu, terlama dulu: [{'bucket', 'n', 'rolling_n',
+        'mean': {field: ...}, 'rolling': {field: ...}}]. rolling adalah rata-rata
+        tertimbang jumlah responden atas `window` ember terakhir yang berisi data.
+        Tanpa filter dibaca dari survey_stats_daily, jadi biayanya mengikuti jumlah hari, bukan jumlah survey.
+        Hari yang bukan tanggal valid atau berasal dari ts <= 0 (timestamp tidak terbaca) dilewati."""
+        expr, default_window = self.TREND_BUCKETS[bucket]
+        sums = ', '.join(f"SUM({f}_sum) AS {f}_sum" for f, _ in RATING_FIELDS)
+        if term or filters:
+            where, params = self._filter_sql(term, filters)
+            where += (" AND " if where else " WHERE ") + "ts > 0"
+            day_sums = ', '.join(f"SUM({f}) AS {f}_sum" for f, _ in RATING_FIELDS)
+            source = (f"(SELECT date(ts / 86400 * 86400, 'unixepoch') AS day, COUNT(*) AS n, {day_sums} "
+                      f"FROM surveys{where} GROUP BY ts / 86400)")
+        else:
+            source, params = "survey_stats_daily", []
+        means = ', '.join(f"{f}_sum * 1.0 / n, SUM({f}_sum) OVER w * 1.0 / SUM(n) OVER w" for f, _ in RATING_FIELDS)
+        with self.conn() as c:
+            rows = c.execute(f'''
+                WITH b AS (SELECT {expr} AS bucket, SUM(n) AS n, {sums} FROM {source}
+                           WHERE n > 0 AND date(day) = day AND day > '1970-01-01' GROUP BY bucket)
+                SELECT bucket, n, SUM(n) OVER w, {means} FROM b
+                WINDOW w AS (ORDER BY bucket ROWS BETWEEN ? PRECEDING AND CURRENT ROW)
+                ORDER BY bucket
+            ''', params + [max(int(window or default_window), 1) - 1]).fetchall()
+        return [{'bucket': r[0], 'n': r[1], 'rolling_n': r[2],
+                 'mean': {f: r[3 + 2*i] for i, (f, _) in enumerate(RATING_FIELDS)},
+                 'rolling': {f: r[4 + 2*i] for i, (f, _) in enumerate(RATING_FIELDS)}} for r in rows]
+
+    def data_version(self):
+        """Penanda perubahan murah: berubah bila koneksi lain (thread pekerja,
+        proses CLI) meng-commit. Tulisan lewat koneksi thread ini sendiri tidak terlihat."""
+        with self.conn() as c:
+            return c.execute("PRAGMA data_version").fetchone()[0]
+
+    def timestamp_range(self):
+        """(awal, akhir) sebagai teks timestamp; dua lookup ujung indeks (ts, id)"""
+        with self.conn() as c:
+            lo = c.execute("SELECT MIN(ts) FROM surveys WHERE ts > 0").fetchone()[0]
+            hi = c.execute("SELECT MAX(ts) FROM surveys WHERE ts > 0").fetchone()[0]
+        return (from_epoch(lo) if lo is not None else None,
+                from_epoch(hi) if hi is not None else None)
+
+    def surveys_between(self, start=None, end=None, term='', filters=None, limit=None):
+        """Survey dengan start <= waktu < end (terbaru dulu). start/end: epoch, datetime, date
+        atau teks ISO; None berarti tanpa batas. Sama dengan filters={'period': (start, end)}
+        pada query_surveys/count_surveys/stats_groups/trend."""
+        return self.query_surveys(term, dict(filters or {}, period=(start, end)), limit=limit)
+
+    def count_between(self, start=None, end=None, term='', filters=None):
+        return self.count_surveys(term, dict(filters or {}, period=(start, end)))
+
+    def rebuild_summaries(self):
+        with self.conn() as c:
+            rebuild_summary_tables(c)
+            c.commit()
+
+    def get_survey(self, sid):
+        with self.conn() as c:
+            r = c.execute("SELECT * FROM surveys WHERE id=?", (pack_id(sid),)).fetchone()
+            return self.survey_row(r) if r else None
+
+    def get_comments(self, sid):
+        with self.conn() as c:
+            r = c.execute("SELECT comments FROM surveys WHERE id=?", (pack_id(sid),)).fetchone()
+            return r[0] if r else None
+
+    def iter_surveys(self, chunk_size=1000, term='', filters=None):
+        """Semua survey (terbaru dulu) diambil per chunk keyset, tanpa memuat seluruh tabel"""
+        cursor = None
+        while True:
+            rows, cursor = self.get_surveys_page(cursor, limit=chunk_size, term=term, filters=filters)
+            yield from rows
+            if cursor is None:
+                return
+
+    def count_surveys(self, term='', filters=None):
+        where, params = self._filter_sql(term, filters)
+        with self.conn() as c:
+            if not where:
+                # Tanpa filter cukup jumlahkan tabel ringkasan (satu baris per lokasi)
+                return c.execute("SELECT COALESCE(SUM(n), 0) FROM survey_stats_location").fetchone()[0]
+            return c.execute(f"SELECT COUNT(*) FROM surveys{where}", params).fetchone()[0]
+
+    def rebuild_search_index(self):
+        # Sejak migrasi 6 rowid surveys (= pk) tidak berubah oleh VACUUM; rebuild tetap memadatkan indeks FTS
+        if not self.has_fts:
+            return False
+        with self.conn() as c:
+            c.execute("INSERT INTO surveys_fts(surveys_fts) VALUES ('rebuild')")
+            c.commit()
+        return True
+
+    def vacuum(self):
+        """Padatkan file database, lalu bangun ulang indeks FTS, tabel ringkasan dan statistik query planner"""
+        with self.conn() as c:
+            c.commit()
+            c.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            c.execute("VACUUM")
+        self.rebuild_search_index()
         with self.conn() as c:
-            kw = f"%{keyword}%"
-            cursor = c.execute('''
-                SELECT * FROM surveys
-                WHERE customer_name LIKE ? OR customer_email LIKE ? OR customer_location LIKE ? OR comments LIKE ?
-                ORDER BY timestamp DESC
-            ''', (kw, kw, kw, kw))
-            return [dict(r) for r in cursor.fetchall()]
+            # Baris yang ditulis di luar aplikasi belum punya location_id
+            assign_locations(c)
+            c.commit()
+        # Perbaiki ringkasan yang meleset, mis. setelah trigger dilewati penulis di luar aplikasi
+        self.rebuild_summaries()
+        with self.conn() as c:
+            c.execute("ANALYZE")
+            c.execute("PRAGMA optimize")
+            c.commit()
 
     def get_all_users(self):
         with self.conn() as c:
             return [dict(r) for r in c.execute(
                 "SELECT id, username, full_name, is_admin FROM users ORDER BY id").fetchall()]
 
-# ------------------ PDF Writer ------------------
-def make_pdf_reportlab(path, rows, footer_info=None):
-    """Buat PDF dengan desain naratif, 4 responden per halaman"""
+# ------------------ Import Massal ------------------
+def prepare_survey(raw, owner_username=''):
+    """Validasi sekaligus normalisasi satu record CSV/JSON dalam satu lintasan (tiap kolom
+    dibaca dan timestamp diparse sekali). Hasil (survey siap simpan, []) atau (None, [pesan, ...]);
+    pesan sama dengan validasi form."""
+    get = raw.get
+    row = {col: str(get(col) or '').strip() for col in SimpleDB.SURVEY_COLUMNS}
+    errors = []
+    if not row['customer_name']:
+        errors.append("Nama harus diisi")
+    if not valid_email(row['customer_email']):
+        errors.append("Email tidak valid")
+    if not valid_phone(row['customer_phone']):
+        errors.append("Nomor telepon tidak valid")
+    if row['timestamp']:
+        row['timestamp'] = normalize_ts(row['timestamp'])
+        if row['timestamp'] is None:
+            errors.append("Timestamp harus berformat YYYY-MM-DD HH:MM:SS")
+    else:
+        row['timestamp'] = now_ts()
+    for field, max_value in RATING_FIELDS:
+        try:
+            value = row[field] = int(row[field] or 0)
+        except ValueError:
+            errors.append(f"Nilai {field} tidak valid")
+            continue
+        if value < 1 or value > max_value:
+            errors.append(f"Nilai {field} harus 1 - {max_value}")
+    if errors:
+        return None, errors
+    row['id'] = row['id'] or gen_id()
+    row['owner_username'] = row['owner_username'] or owner_username
+    return row, errors
+
+def read_survey_file(path):
+    """Iterasi (nomor_baris, record) dari file .csv, .json (array) atau .jsonl"""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        if ext == '.csv':
+            # baris 1 adalah header
+            for n, rec in enumerate(csv.DictReader(f), start=2):
+                yield n, rec
+        elif ext == '.jsonl':
+            for n, line in enumerate(f, start=1):
+                if line.strip():
+                    yield n, json.loads(line)
+        elif ext == '.json':
+            for n, rec in enumerate(json.load(f), start=1):
+                yield n, rec
+        else:
+            raise ValueError(f"Format file tidak didukung: {ext}")
+
+def import_surveys(db, path, owner_username='', chunk_size=50000, progress=None):
+    """Validasi lalu sisipkan isi file survey secara batch, commit per chunk.
+    Hasil (jumlah_masuk, [(nomor_baris, pesan), ...]); progress(jumlah_diproses) opsional.
+    Chunk yang sudah di-commit tidak dibatalkan: TaskCancelled membawa hasil sejauh itu di .partial."""
+    inserted, errors = 0, []
+    chunk, lines = [], []
+    processed = 0
+
+    def flush():
+        nonlocal inserted
+        count, failed = db.bulk_insert_surveys(chunk)
+        inserted += count
+        errors.extend((lines[i], msg) for i, msg in failed)
+        chunk.clear()
+        lines.clear()
+        if progress:
+            progress(processed)
+
     try:
-        doc = SimpleDocTemplate(path, pagesize=A4, topMargin=1.5*cm, bottomMargin=1.5*cm,
-                                leftMargin=1.5*cm, rightMargin=1.5*cm)
-        elements = []
-        styles = getSampleStyleSheet()
-        
-        title_style = ParagraphStyle('MainTitle', parent=styles['Title'], fontSize=16,
-                                     alignment=TA_CENTER, spaceAfter=8, textColor=colors.HexColor('#1a237e'))
-        detail_style = ParagraphStyle('DetailStyle', parent=styles['Normal'], fontSize=9,
-                                       spaceAfter=2, textColor=colors.HexColor('#37474f'), leftIndent=8)
-        comment_style = ParagraphStyle('CommentStyle', parent=styles['Normal'], fontSize=9,
-                                        spaceAfter=8, textColor=colors.HexColor('#546e7a'), leftIndent=8)
-        footer_style = ParagraphStyle('FooterStyle', parent=styles['Normal'], fontSize=7,
-                                       textColor=colors.HexColor('#90a4ae'), alignment=TA_CENTER)
-
-        elements.append(Spacer(1, 2))
-        elements.append(Paragraph("<b>LAPORAN SURVEY KEPUASAN</b>", title_style))
-        elements.append(Spacer(1, 10))
-        
-        current_date = datetime.now().strftime("%d %B %Y")
-        meta_text = f"<b>Tanggal:</b> {current_date} | <b>Oleh:</b> {footer_info.get('user', 'Unknown')} | <b>Responden:</b> {len(rows)}"
-        elements.append(Paragraph(meta_text, detail_style))
-        elements.append(Spacer(1, 15))
-
-        def get_rating_label(value, max_value=5):
-            percentage = (value / max_value) * 100
-            if percentage >= 80: return f"<font color='#2e7d32'><b>Sangat Baik</b> ({value}/{max_value})</font>"
-            elif percentage >= 60: return f"<font color='#f57c00'><b>Baik</b> ({value}/{max_value})</font>"
-            elif percentage >= 40: return f"<font color='#ffb300'><b>Cukup</b> ({value}/{max_value})</font>"
-            else: return f"<font color='#c62828'><b>Perlu Perbaikan</b> ({value}/{max_value})</font>"
-
-        def create_survey_element(idx, row):
-            survey_date = str(row.get('timestamp', ''))[:16]
-            customer_name = str(row.get('customer_name', '')).strip()[:25]
-            customer_location = str(row.get('customer_location', '')).strip() or "Tidak disebutkan"
-            comments = str(row.get('comments', '')).strip() or "Tidak ada komentar"
-            if len(comments) > 120: comments = comments[:117] + "..."
-            
-            survey_content = f"""
+        for n, raw in read_survey_file(path):
+            processed += 1
+            if not isinstance(raw, dict):
+                errors.append((n, "Record bukan objek"))
+                continue
+            row, problems = prepare_survey(raw, owner_username)
+            if problems:
+                errors.append((n, "; ".join(problems)))
+                continue
+            chunk.append(row)
+            lines.append(n)
+            if len(chunk) >= chunk_size:
+                flush()
+        if chunk:
+            flush()
+    except TaskCancelled as e:
+        e.partial = (inserted, errors)
+        raise
+    return inserted, errors
+
+# ------------------ Survey Store ------------------
+class SurveyRecord:
+    """Satu baris survey di SurveyStore tanpa dict per baris: nilai kolom di __slots__.
+    Komentar hanya disimpan pratinjaunya; teks lengkap diambil dari database saat diminta.
+    Bisa dibaca seperti dict (record['kolom'], record.get(), dict(record))."""
+    FIELDS = ('id', 'timestamp', 'customer_name', 'customer_email', 'customer_phone',
+              'customer_gender', 'customer_location', 'quality', 'timeliness',
+              'service', 'overall', 'owner_username', 'ts', 'pk')
+    PREVIEW = 101  # cukup untuk kolom komentar tabel (100 karakter + penanda "...")
+    SELECT = ', '.join(FIELDS) + f", substr(comments, 1, {PREVIEW}), length(comments) > {PREVIEW}"
+    __slots__ = FIELDS + ('db', 'comment_preview', 'truncated')
+
+    # Kolom dengan sedikit nilai berbeda berbagi satu objek string antar baris
+    SHARED = ('customer_gender', 'customer_location', 'owner_username')
+
+    def __init__(self, db, *values):
+        self.db = db
+        for name, value in zip(self.FIELDS + ('comment_preview', 'truncated'), values):
+            setattr(self, name, value)
+        self.id = unpack_id(self.id)
+        for name in self.SHARED:
+            value = getattr(self, name)
+            if value.__class__ is str:
+                setattr(self, name, sys.intern(value))
+
+    @classmethod
+    def wrap(cls, db, row):
+        """SurveyRecord dari dict survey (mis. hasil form atau get_survey); komentar dipotong ke pratinjau"""
+        if isinstance(row, cls):
+            return row
+        comments = row.get('comments') or ''
+        record = cls(db, *(row.get(f) for f in cls.FIELDS), comments[:cls.PREVIEW], len(comments) > cls.PREVIEW)
+        if record.ts is None:
+            record.ts = epoch_or_zero(record.timestamp)
+        return record
+
+    @property
+    def comments(self):
+        if not self.truncated:
+            return self.comment_preview
+        comments = self.db.get_comments(self.id)
+        return self.comment_preview if comments is None else comments
+
+    def keys(self):
+        return self.FIELDS + ('comments',)
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS and key != 'comments':
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.FIELDS or key == 'comments'
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __repr__(self):
+        return f"SurveyRecord(id={self.id!r}, timestamp={self.timestamp!r})"
+
+class SurveyStore:
+    """Model survey di memori: prefiks hasil query (terbaru dulu) yang dimuat per halaman.
+    Lompatan jauh di luar prefiks dilayani cache halaman kecil tanpa memperpanjang prefiks.
+    Simpan/edit/hapus diterapkan per baris lalu diberitahukan ke listener,
+    tanpa membaca ulang seluruh tabel."""
+    MAX_PAGES = 8  # halaman lompatan jauh yang disimpan (LRU)
+
+    def __init__(self, db):
+        self.db = db
+        self.rows = []
+        self.by_id = {}
+        self.pages = {}  # nomor halaman -> baris, untuk viewport jauh di luar prefiks
+        self.cursor = None
+        self.has_more = False
+        self.total = 0
+        self.term = ''
+        self.version = 0  # naik di setiap perubahan data; kunci cache chart statistik
+        self._listeners = []
+
+    def subscribe(self, fn):
+        """fn(action, row) dipanggil dengan action 'reload', 'insert', 'update' atau 'delete'"""
+        self._listeners.append(fn)
+
+    def _notify(self, action, row=None):
+        for fn in self._listeners:
+            fn(action, row)
+
+    def reload(self, term=None):
+        if term is not None:
+            self.term = term
+        self.version += 1
+        self.rows = []
+        self.by_id = {}
+        self.pages = {}
+        self.cursor = None
+        self.has_more = True
+        self.total = self.db.count_surveys(self.term)
+        self.load_more()
+        self._notify('reload')
+
+    def load_more(self, count=SimpleDB.PAGE_SIZE):
+        if not self.has_more:
+            return
+        rows, self.cursor = self.db.get_surveys_page(
+            self.cursor, limit=max(count, SimpleDB.PAGE_SIZE), term=self.term, records=True)
+        self.has_more = self.cursor is not None
+        self.rows.extend(rows)
+        self.by_id.update((r['id'], r) for r in rows)
+
+    def get(self, sid):
+        """Survey berdasarkan id: dari indeks memori, atau satu query primary key bila belum dimuat"""
+        row = self.by_id.get(sid)
+        return row if row is not None else self.db.get_survey(sid)
+
+    def window(self, offset, count, buffer=50):
+        # Ambil halaman tambahan bila viewport (+ buffer) sedikit melewati data yang sudah dimuat
+        needed = offset + count + buffer - len(self.rows)
+        if needed <= 0 or not self.has_more:
+            return self.rows[offset:offset + count]
+        if needed <= SimpleDB.PAGE_SIZE:
+            self.load_more(needed)
+            return self.rows[offset:offset + count]
+        # Lompatan jauh (mis. scrollbar ditarik ke bawah): cukup halaman di sekitar viewport
+        size = SimpleDB.PAGE_SIZE
+        first = offset // size
+        rows = []
+        for page in range(first, (offset + count - 1) // size + 1):
+            rows.extend(self._page(page))
+        start = offset - first * size
+        return rows[start:start + count]
+
+    def _page(self, page):
+        rows = self.pages.pop(page, None)
+        if rows is None:
+            rows, _ = self.db.get_surveys_at(page * SimpleDB.PAGE_SIZE, SimpleDB.PAGE_SIZE,
+                                             term=self.term, records=True)
+        self.pages[page] = rows
+        while len(self.pages) > self.MAX_PAGES:
+            del self.pages[next(iter(self.pages))]
+        return rows
+
+    def _position(self, row):
+        # Binary search pada urutan (ts, pk) menurun
+        key = (row['ts'], row['pk'])
+        lo, hi = 0, len(self.rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if (self.rows[mid]['ts'], self.rows[mid]['pk']) > key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _matches(self, row):
+        return not self.term or self.db.count_surveys(self.term, {'pk': row['pk']}) > 0
+
+    def _insert(self, row, counted=False):
+        # counted: baris sudah termasuk total (update baris di luar prefiks yang dimuat)
+        if not self._matches(row):
+            return False
+        if not counted:
+            self.total += 1
+        pos = self._position(row)
+        # Baris di luar prefiks yang dimuat akan ikut terambil oleh halaman berikutnya
+        if pos < len(self.rows) or not self.has_more:
+            self.rows.insert(pos, row)
+            self.by_id[row['id']] = row
+        return True
+
+    def _remove(self, sid):
+        row = self.by_id.pop(sid, None)
+        if row is None:
+            return None
+        self.total -= 1
+        del self.rows[self._position(row)]
+        return row
+
+    def insert(self, row):
+        self.version += 1
+        self.pages = {}  # posisi baris di halaman lompatan jauh ikut bergeser
+        row = SurveyRecord.wrap(self.db, row)
+        if self._insert(row):
+            self._notify('insert', row)
+
+    def update(self, row):
+        self.version += 1
+        self.pages = {}
+        row = SurveyRecord.wrap(self.db, row)
+        removed = self._remove(row['id'])
+        if removed is not None:
+            inserted = self._insert(row)
+        else:
+            # Baris di luar prefiks (mis. diambil lewat get()) sudah terhitung di total bila cocok
+            # sebelumnya; dengan kata kunci status lamanya tidak diketahui, jadi total dihitung ulang
+            inserted = self._insert(row, counted=True)
+            if self.term:
+                self.total = self.db.count_surveys(self.term)
+        if inserted or removed:
+            self._notify('update', row)
+
+    def remove(self, sid):
+        self.version += 1
+        self.pages = {}
+        row = self._remove(sid)
+        if row:
+            self._notify('delete', row)
+        return row
+
+# ------------------ Statistik ------------------
+class SurveyStats:
+    """Statistik survey (jumlah, rata-rata, min/max, varians, distribusi lokasi)
+    yang digabung dari baris agregat per lokasi, lihat SimpleDB.stats_groups"""
+    def __init__(self, groups):
+        self.total = 0
+        self.first_ts = self.last_ts = None
+        acc = {f: [0, 0, None, None] for f, _ in RATING_FIELDS}
+        locations = {}
+        for g in groups:
+            loc, n, first_ts, last_ts = g[:4]
+            if not n:
+                continue
+            self.total += n
+            locations[loc] = locations.get(loc, 0) + n
+            if first_ts is not None:
+                self.first_ts = first_ts if self.first_ts is None else min(self.first_ts, first_ts)
+                self.last_ts = last_ts if self.last_ts is None else max(self.last_ts, last_ts)
+            for i, (f, _) in enumerate(RATING_FIELDS):
+                total, sq, lo, hi = g[4 + 4*i:8 + 4*i]
+                a = acc[f]
+                a[0] += total or 0
+                a[1] += sq or 0
+                if lo is not None:
+                    a[2] = lo if a[2] is None else min(a[2], lo)
+                    a[3] = hi if a[3] is None else max(a[3], hi)
+        
+        self.ratings = {}
+        for f, scale in RATING_FIELDS:
+            total, sq, lo, hi = acc[f]
+            mean = total / self.total if self.total else 0.0
+            var = max(sq / self.total - mean * mean, 0.0) if self.total else 0.0
+            self.ratings[f] = {'mean': mean, 'min': lo, 'max': hi, 'var': var,
+                               'std': math.sqrt(var), 'scale': scale}
+        self.locations = sorted(locations.items(), key=lambda x: x[1], reverse=True)
+        self.trends = {}  # {ember: SimpleDB.trend(ember)}, diisi from_db
+        self.distribution = {}  # {field: histogram + persentil}, diisi RatingSnapshot.stats
+
+    def mean(self, field):
+        return self.ratings[field]['mean']
+
+    @classmethod
+    def from_db(cls, db, term='', filters=None):
+        if term or filters:
+            stats = cls(db.stats_groups(term, filters))
+        else:
+            # Tanpa filter: baca tabel ringkasan yang dijaga trigger, tidak perlu memindai surveys
+            stats = cls(db.summary_groups())
+            stats.first_ts, stats.last_ts = db.timestamp_range()
+            for f, (lo, hi) in db.rating_extremes().items():
+                if f in stats.ratings:
+                    stats.ratings[f]['min'], stats.ratings[f]['max'] = lo, hi
+        stats.trends = {b: db.trend(b, term=term, filters=filters) for b in db.TREND_BUCKETS}
+        return stats
+
+    @classmethod
+    def from_snapshot(cls, db, snapshot):
+        """Statistik seluruh data dari RatingSnapshot (diperbarui inkremental),
+        lengkap dengan histogram dan persentil; tren tetap dari SQL"""
+        stats = snapshot.refresh(db).stats()
+        stats.trends = {b: db.trend(b) for b in db.TREND_BUCKETS}
+        return stats
+
+    @classmethod
+    def from_rows(cls, rows):
+        # Untuk pemanggil yang hanya memegang list baris (tanpa database)
+        try:
+            return RatingSnapshot.from_rows(rows).stats()
+        except ImportError:
+            pass
+        groups = {}
+        for r in rows:
+            loc = r.get('customer_location')
+            ts = r.get('timestamp', '')
+            g = groups.get(location_key(loc))
+            if g is None:
+                g = groups[location_key(loc)] = [location_label(loc), 0, ts, ts] + [0, 0, None, None] * len(RATING_FIELDS)
+            g[1] += 1
+            g[2], g[3] = min(g[2], ts), max(g[3], ts)
+            for i, (f, _) in enumerate(RATING_FIELDS):
+                v = r.get(f) or 0
+                j = 4 + 4*i
+                g[j] += v
+                g[j+1] += v * v
+                g[j+2] = v if g[j+2] is None else min(g[j+2], v)
+                g[j+3] = v if g[j+3] is None else max(g[j+3], v)
+        return cls(groups.values())
+
+class RatingSnapshot:
+    """Salinan kolumnar (array NumPy) dari kolom penilaian, timestamp (epoch detik)
+    dan kode grup lokasi (per id lokasi; per kunci lokasi untuk from_rows), untuk mean, histogram, persentil dan group-by tanpa overhead
+    per baris. refresh() hanya menambahkan baris dengan rowid baru; bila isi snapshot
+    tidak lagi cocok dengan tabel ringkasan (ada edit/hapus), snapshot dibangun ulang."""
+    def __init__(self):
+        load_numpy()
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.n = 0
+        self.last_rowid = 0
+        self.groups = []           # kode -> kunci grup (id lokasi)
+        self.group_codes = {}      # kunci grup -> kode
+        self.names = {}            # kunci grup -> nama tampilan
+        self.ts = np.empty(0, dtype=np.int64)
+        self.loc = np.empty(0, dtype=np.int32)
+        self.ratings = {f: np.empty(0, dtype=np.int16) for f, _ in RATING_FIELDS}
+
+    def _reserve(self, extra):
+        # Kapasitas tumbuh dua kali lipat agar append berulang tetap amortized O(1)
+        need = self.n + extra
+        if need <= len(self.loc):
+            return
+        cap = max(need, 2 * len(self.loc), 1024)
+        def grow(a):
+            b = np.empty(cap, dtype=a.dtype)
+            b[:self.n] = a[:self.n]
+            return b
+        self.ts, self.loc = grow(self.ts), grow(self.loc)
+        self.ratings = {f: grow(a) for f, a in self.ratings.items()}
+
+    def _code(self, key):
+        code = self.group_codes.get(key)
+        if code is None:
+            code = self.group_codes[key] = len(self.groups)
+            self.groups.append(key)
+        return code
+
+    def append(self, ts, keys, ratings):
+        """ts: epoch detik (-1 bila tidak valid), keys: kunci grup lokasi,
+        ratings: {field: nilai}; ketiganya sepanjang jumlah baris baru"""
+        k = len(keys)
+        if not k:
+            return
+        self._reserve(k)
+        end = self.n + k
+        self.ts[self.n:end] = ts
+        self.loc[self.n:end] = [self._code(key) for key in keys]
+        for f, _ in RATING_FIELDS:
+            self.ratings[f][self.n:end] = ratings[f]
+        self.n = end
+
+    def refresh(self, db, chunk_size=50000):
+        with self._lock:
+            self._load_new(db, chunk_size)
+            if not self._matches(db):
+                self._reset()
+                self._load_new(db, chunk_size)
+        return self
+
+    def _load_new(self, db, chunk_size):
+        cols = ', '.join(f"COALESCE({f}, 0)" for f, _ in RATING_FIELDS)
+        self.names = db.location_names()
+        with db.conn() as c:
+            # Kunci grup sama dengan kunci survey_stats_location agar _matches sebanding
+            cur = c.execute(f'''
+                SELECT rowid, CASE WHEN ts > 0 THEN ts ELSE -1 END, {LOCATION_SUMMARY[1].format('surveys')}, {cols}
+                FROM surveys WHERE rowid > ? ORDER BY rowid
+            ''', (self.last_rowid,))
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    return
+                rowids, ts, location_ids, *ratings = zip(*rows)
+                self.append(ts, location_ids, dict(zip((f for f, _ in RATING_FIELDS), ratings)))
+                self.last_rowid = rowids[-1]
+
+    def _span(self):
+        # (awal, akhir) dari ts yang valid, format sama dengan SimpleDB.timestamp_range
+        valid = self.ts[:self.n][self.ts[:self.n] >= 0]
+        if not len(valid):
+            return None, None
+        return from_epoch(valid.min()), from_epoch(valid.max())
+
+    def _matches(self, db):
+        # Bandingkan jumlah, sum dan sum kuadrat per lokasi dengan tabel ringkasan (murah), plus
+        # rentang waktu: edit yang hanya mengubah timestamp tidak tampak pada agregat penilaian
+        if self._span() != db.timestamp_range():
+            return False
+        groups = db.summary_groups(by_id=True)
+        counts = self.group_counts()
+        if len(groups) != np.count_nonzero(counts):
+            return False
+        sums = {f: (self.group_sum(f), self.group_sum(f, squared=True)) for f, _ in RATING_FIELDS}
+        for g in groups:
+            code = self.group_codes.get(g[0])
+            if code is None or counts[code] != g[1]:
+                return False
+            for i, (f, _) in enumerate(RATING_FIELDS):
+                if sums[f][0][code] != g[4 + 4*i] or sums[f][1][code] != g[5 + 4*i]:
+                    return False
+        return True
+
+    @classmethod
+    def from_rows(cls, rows):
+        snapshot = cls()
+        rows = list(rows)
+        stamps = [str(r.get('timestamp') or '') for r in rows]
+        try:
+            ts = np.array(stamps, dtype='datetime64[s]').astype(np.int64)
+        except ValueError:
+            # Ada teks yang tidak terbaca: hitung per baris, hanya baris itu yang -1
+            ts = [epoch_or_zero(s) or -1 for s in stamps]
+        keys = [location_key(r.get('customer_location')) for r in rows]
+        for key, r in zip(keys, rows):
+            snapshot.names.setdefault(key, location_label(r.get('customer_location')))
+        snapshot.append(ts, keys,
+                        {f: [r.get(f) or 0 for r in rows] for f, _ in RATING_FIELDS})
+        return snapshot
+
+    # ---- agregasi vektor ----
+    def column(self, field):
+        return self.ratings[field][:self.n]
+
+    def mean(self, field):
+        return float(self.column(field).mean()) if self.n else 0.0
+
+    def histogram(self, field, scale):
+        # Jumlah responden per nilai 0..scale
+        return np.bincount(np.clip(self.column(field), 0, None), minlength=scale + 1)
+
+    def percentiles(self, field, q=(25, 50, 75)):
+        return np.percentile(self.column(field), q) if self.n else np.zeros(len(q))
+
+    def group_counts(self):
+        return np.bincount(self.loc[:self.n], minlength=len(self.groups))
+
+    def group_sum(self, field, squared=False):
+        v = self.column(field).astype(np.int64)
+        return np.bincount(self.loc[:self.n], weights=v * v if squared else v,
+                           minlength=len(self.groups)).astype(np.int64)
+
+    def group_extreme(self, field, largest=False):
+        ufunc, start = (np.maximum, np.iinfo(np.int16).min) if largest else (np.minimum, np.iinfo(np.int16).max)
+        out = np.full(len(self.groups), start, dtype=np.int16)
+        ufunc.at(out, self.loc[:self.n], self.column(field))
+        return out
+
+    def stats(self):
+        """SurveyStats dari snapshot, ditambah histogram dan persentil per penilaian"""
+        with self._lock:  # refresh() di thread lain bisa sedang membangun ulang array
+            return self._stats()
+
+    def _stats(self):
+        counts = self.group_counts()
+        per_field = [(self.group_sum(f), self.group_sum(f, squared=True),
+                      self.group_extreme(f), self.group_extreme(f, largest=True)) for f, _ in RATING_FIELDS]
+        groups = []
+        for code in np.flatnonzero(counts):
+            g = [self.names.get(self.groups[code], UNKNOWN_LOCATION), int(counts[code]), None, None]
+            for arrays in per_field:
+                g.extend(int(a[code]) for a in arrays)
+            groups.append(g)
+        stats = SurveyStats(groups)
+        stats.first_ts, stats.last_ts = self._span()
+        for f, scale in RATING_FIELDS:
+            p25, median, p75 = self.percentiles(f)
+            stats.distribution[f] = {'hist': self.histogram(f, scale).tolist(),
+                                     'p25': float(p25), 'median': float(median), 'p75': float(p75)}
+        return stats
+
+# ------------------ PDF Writer ------------------
+class TaskCancelled(Exception):
+    """Dilempar dari callback progress saat tugas latar belakang dibatalkan.
+    partial: hasil pekerjaan yang sudah tersimpan sebelum dibatalkan (None bila tidak ada)"""
+    def __init__(self, partial=None):
+        super().__init__()
+        self.partial = partial
+
+class FlowableStream(list):
+    """List flowable yang diisi bertahap dari generator. ReportLab mengonsumsi
+    flowables dengan del flowables[0], jadi yang tersimpan hanya sebanyak buffer."""
+    def __init__(self, source, buffer=200):
+        super().__init__()
+        self._source = iter(source)
+        self._buffer = buffer
+        self._fill()
+
+    def _fill(self):
+        while self._source is not None and len(self) < self._buffer:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._fill()
+
+def get_rating_label(value, max_value=5):
+    percentage = (value / max_value) * 100
+    if percentage >= 80: return f"<font color='#2e7d32'><b>Sangat Baik</b> ({value}/{max_value})</font>"
+    elif percentage >= 60: return f"<font color='#f57c00'><b>Baik</b> ({value}/{max_value})</font>"
+    elif percentage >= 40: return f"<font color='#ffb300'><b>Cukup</b> ({value}/{max_value})</font>"
+    else: return f"<font color='#c62828'><b>Perlu Perbaikan</b> ({value}/{max_value})</font>"
+
+class ReportTemplate:
+    """Style dan markup laporan yang di-parse sekali lalu dipakai ulang.
+    Markup responden di-parse dengan penanda \\ue000nama\\ue000 di tempat isian;
+    per baris cukup menyalin fragmen penanda dan mengganti teksnya, tanpa
+    melewati parser XML lagi. Label rating (15 kombinasi nilai) juga di-parse sekali."""
+    SLOT_RE = re.compile('\ue000(\\w+)\ue000')
+    RESPONDENT_MARKUP = """
             <para>
-            <b>Tanggal:</b> {survey_date}<br/>
-            <b>Nama:</b> {customer_name}<br/>
-            <b>Lokasi:</b> {customer_location}<br/><br/>
+            <b>Tanggal:</b> \ue000date\ue000<br/>
+            <b>Nama:</b> \ue000name\ue000<br/>
+            <b>Lokasi:</b> \ue000location\ue000<br/><br/>
             <b>HASIL PENILAIAN:</b><br/>
-            • <b>Kualitas:</b> {get_rating_label(row.get('quality', 0))}<br/>
-            • <b>Ketepatan:</b> {get_rating_label(row.get('timeliness', 0))}<br/>
-            • <b>Layanan:</b> {get_rating_label(row.get('service', 0))}<br/>
-            • <b>Kepuasan:</b> {get_rating_label(row.get('overall', 0), 10)}<br/><br/>
+            • <b>Kualitas:</b> \ue000quality\ue000<br/>
+            • <b>Ketepatan:</b> \ue000timeliness\ue000<br/>
+            • <b>Layanan:</b> \ue000service\ue000<br/>
+            • <b>Kepuasan:</b> \ue000overall\ue000<br/><br/>
             <b>KOMENTAR:</b><br/>
-            <i>"{comments}"</i>
+            <i>"\ue000comments\ue000"</i>
             </para>
             """
-            return Paragraph(survey_content, detail_style)
 
-        display_rows = rows[:50]
-        if display_rows:
+    def __init__(self):
+        styles = getSampleStyleSheet()
+        self.title_style = ParagraphStyle('MainTitle', parent=styles['Title'], fontSize=16,
+                                          alignment=TA_CENTER, spaceAfter=8, textColor=colors.HexColor('#1a237e'))
+        self.detail_style = ParagraphStyle('DetailStyle', parent=styles['Normal'], fontSize=9,
+                                           spaceAfter=2, textColor=colors.HexColor('#37474f'), leftIndent=8)
+        self.comment_style = ParagraphStyle('CommentStyle', parent=styles['Normal'], fontSize=9,
+                                            spaceAfter=8, textColor=colors.HexColor('#546e7a'), leftIndent=8)
+        self.footer_style = ParagraphStyle('FooterStyle', parent=styles['Normal'], fontSize=7,
+                                           textColor=colors.HexColor('#90a4ae'), alignment=TA_CENTER)
+        self.rule_style = ParagraphStyle(name='paragraphImplicitDefaultStyle')
+        self.rating_frags = {(v, m): self.parse(get_rating_label(v, m))
+                             for m in {m for _, m in RATING_FIELDS} for v in range(1, m + 1)}
+        self.respondent_frags = self.parse(self.RESPONDENT_MARKUP)
+        self.heading_frags = self.parse("<b>📋 RESPONDEN #\ue000idx\ue000</b>")
+        self.rule_frags = self.parse("<hr width='100%' size='0.3' color='#e0e0e0'/>", self.rule_style)
+
+    def parse(self, markup, style=None):
+        """Pecah markup menjadi fragmen; tiap fragmen yang memuat penanda
+        disimpan sebagai (frag, [potongan teks / nama isian])."""
+        frags = []
+        for f in Paragraph(markup, style or self.detail_style).frags:
+            parts = self.SLOT_RE.split(getattr(f, 'text', ''))
+            frags.append((f, parts) if len(parts) > 1 else (f, None))
+        return frags
+
+    def rating(self, value, max_value):
+        frags = self.rating_frags.get((value, max_value))
+        if frags is None:
+            # Nilai di luar skala (data lama/impor): parse seperti sebelumnya
+            frags = self.parse(get_rating_label(value, max_value))
+        return frags
+
+    def fill(self, frags, values):
+        # Fragmen statis dibagi bersama; hanya fragmen berisian yang disalin.
+        # Isian teks digabung dengan teks di sekitarnya (style-nya sama), isian
+        # berupa list fragmen (label rating) disisipkan apa adanya.
+        out = []
+        for f, parts in frags:
+            if parts is None:
+                out.append(f)
+                continue
+            text = parts[0]
+            for i in range(1, len(parts), 2):
+                value = values[parts[i]]
+                if isinstance(value, list):
+                    if text: out.append(f.clone(text=text))
+                    out.extend(g for g, _ in value)
+                    text = parts[i+1]
+                else:
+                    text += value + parts[i+1]
+            if text: out.append(f.clone(text=text))
+        return out
+
+    def markup(self, row):
+        # Bentuk markup lengkap per baris (jalur lama); dipakai sebagai pembanding benchmark
+        comments = str(row.get('comments', '')).strip() or "Tidak ada komentar"
+        if len(comments) > 120: comments = comments[:117] + "..."
+        values = {
+            'date': str(row.get('timestamp', ''))[:16],
+            'name': escape(str(row.get('customer_name', '')).strip()[:25]),
+            'location': escape(str(row.get('customer_location', '')).strip()) or "Tidak disebutkan",
+            'comments': escape(comments),
+        }
+        for f, m in RATING_FIELDS:
+            values[f] = get_rating_label(row.get(f, 0), m)
+        return self.SLOT_RE.sub(lambda mo: values[mo.group(1)], self.RESPONDENT_MARKUP)
+
+    def respondent(self, row):
+        values = {
+            'date': str(row.get('timestamp', ''))[:16],
+            'name': str(row.get('customer_name', '')).strip()[:25],
+            'location': str(row.get('customer_location', '')).strip() or "Tidak disebutkan",
+        }
+        comments = str(row.get('comments', '')).strip() or "Tidak ada komentar"
+        values['comments'] = comments[:117] + "..." if len(comments) > 120 else comments
+        for f, m in RATING_FIELDS:
+            values[f] = self.rating(row.get(f, 0), m)
+        return Paragraph('', self.detail_style, frags=self.fill(self.respondent_frags, values))
+
+    def heading(self, idx):
+        return Paragraph('', self.detail_style, frags=self.fill(self.heading_frags, {'idx': str(idx)}))
+
+    def rule(self):
+        return Paragraph('', self.rule_style, frags=[f for f, _ in self.rule_frags])
+
+_report_template = None
+
+def report_template():
+    # Dibuat sekali per proses (termasuk tiap proses pekerja make_pdf_sharded)
+    global _report_template
+    if _report_template is None:
+        load_reportlab()
+        _report_template = ReportTemplate()
+    return _report_template
+
+def make_pdf_reportlab(path, rows, footer_info=None, stats=None, progress=None,
+                       start_index=1, page_offset=0, total_rows=None,
+                       include_header=True, include_summary=True, recent=None):
+    """Buat PDF dengan desain naratif, 4 responden per halaman.
+    rows boleh berupa iterator (mis. SimpleDB.iter_surveys) agar flowable dibuat
+    bertahap dengan memori terbatas. stats (SurveyStats) sebaiknya dari SimpleDB;
+    bila kosong dihitung dari rows. progress(selesai, total) dipanggil tiap 100 responden.
+    Parameter sisanya untuk merender satu potongan laporan (lihat make_pdf_sharded):
+    nomor responden mulai start_index, nomor halaman digeser page_offset, judul
+    hanya bila include_header, halaman statistik hanya bila include_summary,
+    recent = 3 survey terbaru untuk bagian tren bila tidak ada di rows."""
+    try:
+        load_reportlab()
+        if stats is None:
+            rows = list(rows)
+            stats = SurveyStats.from_rows(rows)
+        footer_info = footer_info or {}
+        if total_rows is None:
+            total_rows = len(rows) if hasattr(rows, '__len__') else stats.total
+        doc = SimpleDocTemplate(path, pagesize=A4, topMargin=1.5*cm, bottomMargin=1.5*cm,
+                                leftMargin=1.5*cm, rightMargin=1.5*cm)
+        tpl = report_template()
+        title_style, detail_style, footer_style = tpl.title_style, tpl.detail_style, tpl.footer_style
+
+        # 3 survey terbaru (rows terurut terbaru dulu) untuk bagian tren
+        recent = list(recent) if recent is not None else []
+        collect_recent = not recent
+
+        def survey_elements():
             surveys_per_page = 4
-            total_pages = (len(display_rows) + surveys_per_page - 1) // surveys_per_page
-            
-            for page_num in range(total_pages):
-                if page_num > 0: elements.append(PageBreak())
-                start_idx = page_num * surveys_per_page
-                end_idx = min(start_idx + surveys_per_page, len(display_rows))
-                
-                for i, survey in enumerate(display_rows[start_idx:end_idx]):
-                    survey_idx = start_idx + i + 1
-                    elements.append(Paragraph(f"<b>📋 RESPONDEN #{survey_idx}</b>", detail_style))
-                    elements.append(create_survey_element(survey_idx, survey))
-                    if i < end_idx - start_idx - 1:
-                        elements.append(Paragraph("<hr width='100%' size='0.3' color='#e0e0e0'/>"))
-                        elements.append(Spacer(1, 3))
-                elements.append(Spacer(1, 12))
-
-        elements.append(PageBreak())
-        if rows and len(rows) > 0:
-            total = len(rows)
-            avg_quality = sum(r.get('quality', 0) for r in rows) / total
-            avg_timeliness = sum(r.get('timeliness', 0) for r in rows) / total
-            avg_service = sum(r.get('service', 0) for r in rows) / total
-            avg_overall = sum(r.get('overall', 0) for r in rows) / total
-            
-            elements.append(Paragraph("<b>ANALISIS STATISTIK</b>", title_style))
-            elements.append(Spacer(1, 25))
-            
-            stats_text = f"""
-            <b>📊 STATISTIK UTAMA</b><br/>
-            <b>Total Responden:</b> {total} orang<br/>
-            <b>Periode:</b> {rows[-1].get('timestamp', '')[:10] if rows else 'N/A'} - {rows[0].get('timestamp', '')[:10] if rows else 'N/A'}<br/><br/>
-            <b>📈 RATA-RATA PENILAIAN</b><br/>
-            <b>Kualitas:</b> {avg_quality:.2f}/5 ({(avg_quality/5)*100:.1f}%)<br/>
-            <b>Ketepatan:</b> {avg_timeliness:.2f}/5 ({(avg_timeliness/5)*100:.1f}%)<br/>
-            <b>Layanan:</b> {avg_service:.2f}/5 ({(avg_service/5)*100:.1f}%)<br/>
-            <b>Kepuasan:</b> {avg_overall:.2f}/10 ({(avg_overall/10)*100:.1f}%)
-            """
-            elements.append(Paragraph(stats_text, detail_style))
-            elements.append(Spacer(1, 20))
+            count = 0
+            for count, survey in enumerate(rows, start=1):
+                survey_idx = start_index + count - 1
+                if collect_recent and len(recent) < 3: recent.append(survey)
+                pos = (survey_idx - 1) % surveys_per_page
+                if pos == 0 and count > 1:
+                    yield Spacer(1, 12)
+                    yield PageBreak()
+                elif pos > 0:
+                    yield tpl.rule()
+                    yield Spacer(1, 3)
+                yield tpl.heading(survey_idx)
+                yield tpl.respondent(survey)
+                if progress and count % 100 == 0:
+                    progress(count, total_rows)
+            if count:
+                yield Spacer(1, 12)
+            if progress:
+                progress(count, total_rows)
 
-        if len(rows) >= 3:
-            recent = rows[:3]
-            recent_avg = sum(r.get('overall', 0) for r in recent) / 3
-            overall_avg = avg_overall
+        def report_elements():
+            if include_header:
+                yield Spacer(1, 2)
+                yield Paragraph("<b>LAPORAN SURVEY KEPUASAN</b>", title_style)
+                yield Spacer(1, 10)
                 
-            trend_text = f"""
-            <para>
-            <font size=10>
-            <b>📅 TREN TERKINI</b><br/>
-            <b>3 Survey Terbaru:</b> {recent_avg:.2f}/10<br/>
-            <b>Seluruh Data:</b> {overall_avg:.2f}/10<br/>
-            """
-                
-            if recent_avg > overall_avg + 0.5:
-                trend_text += f"""<font color='#2e7d32'>📈 <b>TREN MENINGKAT</b></font>"""
-            elif recent_avg < overall_avg - 0.5:
-                trend_text += f"""<font color='#c62828'>📉 <b>TREN MENURUN</b></font>"""
-            else:
-                trend_text += f"""<font color='#f57c00'>➡️ <b>TREN STABIL</b></font>"""
+                current_date = datetime.now().strftime("%d %B %Y")
+                meta_text = f"<b>Tanggal:</b> {current_date} | <b>Oleh:</b> {footer_info.get('user', 'Unknown')} | <b>Responden:</b> {stats.total}"
+                yield Paragraph(meta_text, detail_style)
+                yield Spacer(1, 15)
+
+            yield from survey_elements()
+
+            if not include_summary:
+                return
+            yield PageBreak()
+            if stats.total > 0:
+                total = stats.total
+                avg_quality = stats.mean('quality')
+                avg_timeliness = stats.mean('timeliness')
+                avg_service = stats.mean('service')
+                avg_overall = stats.mean('overall')
                 
-            trend_text += "</font></para>"
-            trend_para = Paragraph(trend_text, detail_style)
-            elements.append(trend_para)
+                yield Paragraph("<b>ANALISIS STATISTIK</b>", title_style)
+                yield Spacer(1, 25)
                 
-            elements.append(Spacer(1, 15))
+                stats_text = f"""
+                <b>📊 STATISTIK UTAMA</b><br/>
+                <b>Total Responden:</b> {total} orang<br/>
+                <b>Periode:</b> {(stats.first_ts or 'N/A')[:10]} - {(stats.last_ts or 'N/A')[:10]}<br/><br/>
+                <b>📈 RATA-RATA PENILAIAN</b><br/>
+                <b>Kualitas:</b> {avg_quality:.2f}/5 ({(avg_quality/5)*100:.1f}%)<br/>
+                <b>Ketepatan:</b> {avg_timeliness:.2f}/5 ({(avg_timeliness/5)*100:.1f}%)<br/>
+                <b>Layanan:</b> {avg_service:.2f}/5 ({(avg_service/5)*100:.1f}%)<br/>
+                <b>Kepuasan:</b> {avg_overall:.2f}/10 ({(avg_overall/10)*100:.1f}%)
+                """
+                if stats.distribution:
+                    # Sebaran nilai dari RatingSnapshot (P25 / median / P75)
+                    stats_text += "<br/><br/><b>📐 SEBARAN NILAI (P25 / Median / P75)</b>"
+                    for (f, scale), label in zip(RATING_FIELDS, ('Kualitas', 'Ketepatan', 'Layanan', 'Kepuasan')):
+                        d = stats.distribution[f]
+                        stats_text += f"<br/><b>{label}:</b> {d['p25']:g} / {d['median']:g} / {d['p75']:g} (dari {scale})"
+                yield Paragraph(stats_text, detail_style)
+                yield Spacer(1, 20)
 
-        recommendations = """
-            <para>
-            <font size=10>
-            <b>💡 REKOMENDASI</b><br/>
-            1. Pertahankan aspek dengan rating tertinggi<br/>
-            2. Fokus perbaikan pada aspek terendah<br/>
-            3. Tinjau komentar untuk insight spesifik<br/>
-            4. Lakukan follow-up pada rating rendah<br/>
-            5. Pantau tren kepuasan berkala
-            </font>
-            </para>
-            """
-        rec_para = Paragraph(recommendations, detail_style)
-        elements.append(rec_para)
-            
-        elements.append(Spacer(1, 15))
+            if len(recent) >= 3 and stats.total >= 3:
+                recent_avg = sum(r.get('overall', 0) for r in recent) / 3
+                overall_avg = stats.mean('overall')
+                    
+                trend_text = f"""
+                <para>
+                <font size=10>
+                <b>📅 TREN TERKINI</b><br/>
+                <b>3 Survey Terbaru:</b> {recent_avg:.2f}/10<br/>
+                <b>Seluruh Data:</b> {overall_avg:.2f}/10<br/>
+                """
+                    
+                if recent_avg > overall_avg + 0.5:
+                    trend_text += f"""<font color='#2e7d32'>📈 <b>TREN MENINGKAT</b></font>"""
+                elif recent_avg < overall_avg - 0.5:
+                    trend_text += f"""<font color='#c62828'>📉 <b>TREN MENURUN</b></font>"""
+                else:
+                    trend_text += f"""<font color='#f57c00'>➡️ <b>TREN STABIL</b></font>"""
+                    
+                trend_text += "</font></para>"
+                yield Paragraph(trend_text, detail_style)
+                yield Spacer(1, 15)
 
-        current_year = datetime.now().year
-        footer_text = f"<b>Laporan Survey Kepuasan</b><br/>{APP_TITLE} - versi {APP_VERSION} • © {current_year}"
-        elements.append(Paragraph(footer_text, footer_style))
+            # Tren bulanan dari SimpleDB.trend (hanya ada bila stats dibuat dari database)
+            months = stats.trends.get('month', [])[-12:]
+            if months:
+                window = SimpleDB.TREND_BUCKETS['month'][1]
+                labels = ('Kualitas', 'Ketepatan', 'Layanan', 'Kepuasan')
+                month_text = (f"<font size=10><b>📆 TREN BULANAN</b></font> "
+                              f"(12 bulan terakhir, bergulir = rata-rata {window} bulan)<br/><font size=8>")
+                for b in months:
+                    means = ' | '.join(f"{label} {b['mean'][f]:.2f}" for (f, _), label in zip(RATING_FIELDS, labels))
+                    month_text += (f"<b>{b['bucket'][:7]}</b>: {b['n']} responden | {means} | "
+                                   f"Kepuasan bergulir {b['rolling']['overall']:.2f}/10<br/>")
+                month_text += "</font>"
+                yield Paragraph(month_text, detail_style)
+                yield Spacer(1, 15)
+
+            recommendations = """
+                <para>
+                <font size=10>
+                <b>💡 REKOMENDASI</b><br/>
+                1. Pertahankan aspek dengan rating tertinggi<br/>
+                2. Fokus perbaikan pada aspek terendah<br/>
+                3. Tinjau komentar untuk insight spesifik<br/>
+                4. Lakukan follow-up pada rating rendah<br/>
+                5. Pantau tren kepuasan berkala
+                </font>
+                </para>
+                """
+            yield Paragraph(recommendations, detail_style)
+            yield Spacer(1, 15)
+
+            current_year = datetime.now().year
+            footer_text = f"<b>Laporan Survey Kepuasan</b><br/>{APP_TITLE} - versi {APP_VERSION} • © {current_year}"
+            yield Paragraph(footer_text, footer_style)
         
         def add_header_footer(canvas, doc):
             canvas.saveState()
-            page_num = canvas.getPageNumber()
-            if page_num > 1 and page_num <= ((len(display_rows) + 1) // 2 if display_rows else 0):            
+            page_num = page_offset + canvas.getPageNumber()
+            if page_num > 1 and page_num <= ((total_rows + 1) // 2 if total_rows else 0):            
                 canvas.setFont('Helvetica', 6)
                 canvas.setFillColor(colors.HexColor('#90a4ae'))
                 canvas.drawString(1.5*cm, 0.8*cm, f"Hal. {page_num}")
-                canvas.drawCentredString(doc.width/2 + 1.5*cm, 0.8*cm, f"Total: {len(rows)} responden")
+                canvas.drawCentredString(doc.width/2 + 1.5*cm, 0.8*cm, f"Total: {stats.total} responden")
                 canvas.restoreState()
         
-        doc.build(elements, onFirstPage=add_header_footer, onLaterPages=add_header_footer)
+        doc.build(FlowableStream(report_elements()), onFirstPage=add_header_footer, onLaterPages=add_header_footer)
         return True, None
         
+    except TaskCancelled:
+        raise
     except Exception as e:
         import traceback
         return False, f"Error membuat PDF: {str(e)}\n\nTraceback:\n{traceback.format_exc()}"
 
+def benchmark_pdf(db, n=1000):
+    """Ukur biaya per responden (ms): parse markup per baris vs fragmen template
+    (keduanya sampai wrap), lalu render PDF utuh ke memori."""
+    rows, _ = db.get_surveys_page(None, limit=n)
+    if not rows:
+        return {}
+    tpl = report_template()  # juga memuat reportlab
+    width = A4[0] - 3*cm
+
+    def per_row(build):
+        t = time.perf_counter()
+        for r in rows:
+            build(r).wrap(width, A4[1])
+        return (time.perf_counter() - t) * 1000 / len(rows)
+
+    result = {
+        'rows': len(rows),
+        'parse_ms': per_row(lambda r: Paragraph(tpl.markup(r), tpl.detail_style)),
+        'template_ms': per_row(tpl.respondent),
+    }
+    t = time.perf_counter()
+    make_pdf_reportlab(io.BytesIO(), rows, {'user': 'benchmark'})
+    result['pdf_ms'] = (time.perf_counter() - t) * 1000 / len(rows)
+    return result
+
+def benchmark_memory(db, n=10000):
+    """Memori yang tertahan per baris (byte) untuk n survey terbaru: dict penuh vs SurveyRecord"""
+    import tracemalloc
+    result = {}
+    for name, records in (('dict', False), ('record', True)):
+        tracemalloc.start()
+        rows, _ = db.get_surveys_page(None, limit=n, records=records)
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        if not rows:
+            return {}
+        result['rows'] = len(rows)
+        result[f'{name}_bytes'] = size / len(rows)
+        del rows
+    result['saved_pct'] = 100 * (1 - result['record_bytes'] / result['dict_bytes'])
+    return result
+
+def benchmark_startup(runs=5):
+    """Waktu (ms) memuat modul aplikasi + tkinter di interpreter baru, yaitu kerja
+    sebelum jendela login bisa dibangun. Juga melaporkan modul berat yang ikut termuat."""
+    code = ("import runpy, sys, time\n"
+            "t = time.perf_counter()\n"
+            "runpy.run_path(sys.argv[1], run_name='startup')['load_gui']()\n"
+            "print((time.perf_counter() - t) * 1000)\n"
+            "print(' '.join(m for m in ('matplotlib', 'reportlab', 'numpy') if m in sys.modules))\n")
+    times, loaded = [], ''
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', code, os.path.abspath(__file__)],
+                             capture_output=True, text=True, check=True).stdout.splitlines()
+        times.append(float(out[0]))
+        loaded = out[1] if len(out) > 1 else ''
+    times.sort()
+    return {'runs': runs, 'median_ms': times[len(times) // 2], 'min_ms': times[0],
+            'heavy_modules': loaded.split()}
+
+def _render_shard(job):
+    # Dijalankan di proses pekerja: ambil baris potongan langsung dari database lalu render.
+    # Berkas cancel_path dibuat proses induk saat batal; diperiksa tiap awal halaman.
+    db = SimpleDB(job['db_path'])
+    try:
+        rows, _ = db.get_surveys_page(job['cursor'], limit=job['limit'])
+    finally:
+        db.close()
+    
+    def checked_rows():
+        for n, row in enumerate(rows):
+            if n % 4 == 0 and os.path.exists(job['cancel_path']):
+                raise TaskCancelled()
+            yield row
+    ok, error = make_pdf_reportlab(job['path'], checked_rows(), job['footer_info'], stats=job['stats'],
+                                   start_index=job['start_index'], page_offset=job['page_offset'],
+                                   total_rows=job['total_rows'], include_header=job['include_header'],
+                                   include_summary=job['include_summary'], recent=job['recent'])
+    if not ok:
+        raise RuntimeError(error)
+    return job['index'], _pdf_page_count(job['path'])
+
+def _pdf_page_count(path):
+    from pypdf import PdfReader
+    return len(PdfReader(path).pages)
+
+def make_pdf_sharded(path, db, footer_info=None, stats=None, progress=None, workers=None, shard_rows=None):
+    """Seperti make_pdf_reportlab atas seluruh survey, tetapi responden dibagi menjadi
+    potongan kelipatan 4 (rata halaman) yang dirender paralel di ProcessPoolExecutor,
+    lalu digabung dengan pypdf. Nomor halaman tetap bersambung seperti add_header_footer.
+    Tanpa pypdf, dengan satu pekerja atau bila hanya ada satu potongan kembali ke
+    make_pdf_reportlab biasa di proses ini."""
+    import tempfile, shutil
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+    workers = workers or os.cpu_count() or 1
+    stats = stats or SurveyStats.from_db(db)
+    total = stats.total
+    try:
+        from pypdf import PdfWriter
+    except ImportError:
+        PdfWriter = None
+    surveys_per_page = 4
+    if not shard_rows:
+        # Beberapa potongan per pekerja supaya beban merata dan progress lebih halus
+        shard_rows = min(max(total // (workers * 4), 200), 5000)
+    shard_rows = max(surveys_per_page, shard_rows - shard_rows % surveys_per_page)
+    if PdfWriter is None or workers < 2 or total <= shard_rows:
+        return make_pdf_reportlab(path, db.iter_surveys(), footer_info, stats=stats, progress=progress)
+    
+    # Cursor keyset awal tiap potongan dari satu pemindaian indeks (ts, pk)
+    cursors, recent = [None], []
+    with db.conn() as c:
+        for n, r in enumerate(c.execute("SELECT ts, pk FROM surveys ORDER BY ts DESC, pk DESC"), start=1):
+            if n % shard_rows == 0 and n < total:
+                cursors.append((r[0], r[1]))
+    recent = db.query_surveys(limit=3)
+    
+    tmpdir = tempfile.mkdtemp(prefix='survey_pdf_')
+    cancel_path = os.path.join(tmpdir, 'cancel')
+    jobs = []
+    for i, cursor in enumerate(cursors):
+        jobs.append({
+            'index': i, 'db_path': db.path, 'cursor': cursor, 'limit': shard_rows,
+            'path': os.path.join(tmpdir, f"part{i:05d}.pdf"), 'footer_info': footer_info, 'stats': stats,
+            'start_index': i * shard_rows + 1, 'total_rows': total,
+            # Perkiraan awal: tiap potongan tepat shard_rows/4 halaman
+            'page_offset': i * (shard_rows // surveys_per_page),
+            'include_header': i == 0, 'include_summary': i == len(cursors) - 1, 'recent': recent,
+            'cancel_path': cancel_path,
+        })
+    
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pages = [0] * len(jobs)
+        pending = {pool.submit(_render_shard, job) for job in jobs}
+        done_rows = 0
+        while pending:
+            # Progress dipanggil berkala (bukan hanya per potongan) agar tombol Batal cepat terasa
+            finished, pending = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+            for future in finished:
+                index, count = future.result()
+                pages[index] = count
+                done_rows = min(total, done_rows + shard_rows)
+            if progress:
+                progress(done_rows, total)
+        
+        # Potongan yang halamannya meluap (mis. teks panjang) menggeser nomor halaman
+        # potongan setelahnya; render ulang yang offset-nya meleset
+        offset, redo = 0, []
+        for job, count in zip(jobs, pages):
+            if job['page_offset'] != offset:
+                job['page_offset'] = offset
+                redo.append(pool.submit(_render_shard, job))
+            offset += count
+        for future in redo:
+            future.result()
+        
+        writer = PdfWriter()
+        for job in jobs:
+            writer.append(job['path'])
+        with open(path, 'wb') as f:
+            writer.write(f)
+        return True, None
+    except TaskCancelled:
+        raise
+    except Exception as e:
+        import traceback
+        return False, f"Error membuat PDF: {str(e)}\n\nTraceback:\n{traceback.format_exc()}"
+    finally:
+        # Potongan yang masih berjalan (batal atau error) berhenti di halaman berikutnya
+        open(cancel_path, 'w').close()
+        pool.shutdown(wait=True, cancel_futures=True)
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+# ------------------ VIRTUAL TABLE ------------------
+class VirtualTable:
+    """Treeview tervirtualisasi: hanya ada item sebanyak baris yang terlihat di layar.
+    Saat scroll, item yang sama diisi ulang dengan baris lain dari sumber data.
+    row_count() -> jumlah total baris, get_rows(offset, count) -> list baris,
+    format_row(row) -> tuple nilai kolom. Tag item berisi id baris."""
+    def __init__(self, master, columns, column_widths, row_count, get_rows, format_row, row_height=25):
+        self.row_count = row_count
+        self.get_rows = get_rows
+        self.format_row = format_row
+        self.row_height = row_height
+        self.offset = 0
+        self.visible = 15
+        self.total = 0
+        self.selected_id = None
+        self._selection_shown = False
+        self.item_rows = {}
+        
+        self.tree = ttk.Treeview(master, columns=columns, show='headings', height=self.visible)
+        for col in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=column_widths.get(col, 100), minwidth=50)
+        
+        self.vsb = ttk.Scrollbar(master, orient='vertical', command=self.yview)
+        self.hsb = ttk.Scrollbar(master, orient='horizontal', command=self.tree.xview)
+        self.tree.configure(xscrollcommand=self.hsb.set)
+        
+        self.tree.grid(row=0, column=0, sticky='nsew')
+        self.vsb.grid(row=0, column=1, sticky='ns')
+        self.hsb.grid(row=1, column=0, sticky='ew')
+        master.grid_rowconfigure(0, weight=1)
+        master.grid_columnconfigure(0, weight=1)
+        
+        self.tree.bind('<Configure>', self.on_resize)
+        self.tree.bind('<MouseWheel>', lambda e: self.scroll(-3 if e.delta > 0 else 3))
+        self.tree.bind('<Button-4>', lambda e: self.scroll(-3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll(3))
+        self.tree.bind('<Up>', lambda e: self.on_key(-1))
+        self.tree.bind('<Down>', lambda e: self.on_key(1))
+        self.tree.bind('<Prior>', lambda e: self.scroll(-self.visible) or 'break')
+        self.tree.bind('<Next>', lambda e: self.scroll(self.visible) or 'break')
+
+    def refresh(self, reset=False):
+        self.total = self.row_count()
+        if reset:
+            self.offset = 0
+        self.render()
+
+    def on_resize(self, event):
+        # Baris heading kira-kira setinggi satu baris data
+        visible = max(1, event.height // self.row_height - 1)
+        if visible != self.visible:
+            self.visible = visible
+            self.render()
+
+    def yview(self, *args):
+        if args[0] == 'moveto':
+            self.offset = int(float(args[1]) * self.total)
+        elif args[0] == 'scroll':
+            step = self.visible if args[2] == 'pages' else 1
+            self.offset += int(args[1]) * step
+        self.render()
+
+    def scroll(self, rows):
+        self.offset += rows
+        self.render()
+
+    def row_of(self, item):
+        return self.item_rows.get(item)
+
+    def on_key(self, direction):
+        # Di tepi viewport, geser data satu baris lalu biarkan Treeview memindahkan seleksi
+        items = self.tree.get_children()
+        sel = self.tree.selection()
+        if items and sel and sel[0] == items[0 if direction < 0 else -1]:
+            self.scroll(direction)
+
+    def render(self):
+        sel = self.tree.selection()
+        if sel:
+            tags = self.tree.item(sel[0], 'tags')
+            self.selected_id = tags[0] if tags else None
+        elif self._selection_shown:
+            self.selected_id = None
+        
+        self.offset = max(0, min(self.offset, self.total - self.visible))
+        rows = self.get_rows(self.offset, self.visible) if self.total else []
+        
+        items = list(self.tree.get_children())
+        while len(items) < len(rows):
+            items.append(self.tree.insert('', 'end'))
+        if len(items) > len(rows):
+            self.tree.delete(*items[len(rows):])
+            items = items[:len(rows)]
+        
+        selected_item = None
+        self.item_rows = dict(zip(items, rows))
+        for item, row in self.item_rows.items():
+            self.tree.item(item, values=self.format_row(row), tags=(row['id'],))
+            if row['id'] == self.selected_id:
+                selected_item = item
+        
+        self.tree.selection_set(selected_item or ())
+        self._selection_shown = selected_item is not None
+        if self.total:
+            self.vsb.set(self.offset / self.total, (self.offset + len(rows)) / self.total)
+        else:
+            self.vsb.set(0, 1)
+
+# ------------------ BACKGROUND TASK ------------------
+_worker_pool = None
+
+def worker_pool():
+    # Pool kecil dan tetap, jadi jumlah koneksi SQLite per thread pekerja juga terbatas
+    global _worker_pool
+    if _worker_pool is None:
+        _worker_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='survey-worker')
+    return _worker_pool
+
+class BackgroundTask:
+    """Jalankan fn(progress) di thread pekerja tanpa memblokir Tk.
+    progress(selesai, total) dipanggil dari thread pekerja dan melempar TaskCancelled
+    setelah tombol Batal ditekan. Hasil dikirim ke on_done / on_error / on_cancel
+    di thread Tk melalui root.after. on_cancel(hasil_sebagian) juga dipanggil bila Batal
+    ditekan tepat saat fn selesai. Dialog progress baru muncul setelah show_after_ms."""
+    def __init__(self, root, title, fn, on_done, on_error=None, on_cancel=None,
+                 show_after_ms=300, poll_ms=100):
+        self.root = root
+        self.title = title
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+        self.on_finish = None
+        self.poll_ms = poll_ms
+        self.cancelled = threading.Event()
+        self.state = (0, 0)
+        self.dialog = None
+        self.started = time.perf_counter()
+        self.show_after = show_after_ms / 1000
+        self.future = worker_pool().submit(fn, self.progress)
+        self.root.after(poll_ms, self.poll)
+
+    def progress(self, done, total=0):
+        if self.cancelled.is_set():
+            raise TaskCancelled()
+        self.state = (done, total)
+
+    def cancel(self):
+        self.cancelled.set()
+        if self.dialog:
+            self.status_label.config(text="Membatalkan...")
+            self.cancel_btn.config(state='disabled')
+
+    def build_dialog(self):
+        self.dialog = tk.Toplevel(self.root)
+        self.dialog.title(self.title)
+        self.dialog.geometry("360x130")
+        self.dialog.resizable(False, False)
+        self.dialog.transient(self.root)
+        self.dialog.protocol("WM_DELETE_WINDOW", self.cancel)
+        
+        self.status_label = tk.Label(self.dialog, text=f"{self.title}...", font=("Arial", 10))
+        self.status_label.pack(pady=(15, 5))
+        self.bar = ttk.Progressbar(self.dialog, length=300, mode='indeterminate')
+        self.bar.pack(pady=5)
+        self.bar.start(15)
+        self.cancel_btn = ttk.Button(self.dialog, text="Batal", command=self.cancel)
+        self.cancel_btn.pack(pady=5)
+
+    def update_dialog(self):
+        done, total = self.state
+        if total > 0:
+            if str(self.bar.cget('mode')) != 'determinate':
+                self.bar.stop()
+                self.bar.config(mode='determinate', maximum=total)
+            self.bar.config(value=done)
+            text = f"{self.title}: {done}/{total}"
+        else:
+            text = f"{self.title}: {done}" if done else f"{self.title}..."
+        if not self.cancelled.is_set():
+            self.status_label.config(text=text)
+
+    def poll(self):
+        if not self.future.done():
+            if self.dialog is None and time.perf_counter() - self.started >= self.show_after:
+                self.build_dialog()
+            if self.dialog:
+                self.update_dialog()
+            self.root.after(self.poll_ms, self.poll)
+            return
+        
+        if self.dialog:
+            self.dialog.destroy()
+        if self.on_finish:
+            self.on_finish()
+        try:
+            result = self.future.result()
+        except TaskCancelled as e:
+            if self.on_cancel:
+                self.on_cancel(e.partial)
+        except Exception as e:
+            if self.on_error:
+                self.on_error(e)
+            else:
+                messagebox.showerror("❌ Error", f"Terjadi kesalahan tidak terduga:\n\n{str(e)}")
+        else:
+            if not self.cancelled.is_set():
+                self.on_done(result)
+            elif self.on_cancel:
+                self.on_cancel(result)
+
+# ------------------ CHART STATISTIK ------------------
+def stats_summary_text(stats):
+    total = stats.total
+    avg_quality = stats.mean('quality')
+    avg_timeliness = stats.mean('timeliness')
+    avg_service = stats.mean('service')
+    avg_overall = stats.mean('overall')
+    sorted_locations = stats.locations
+    
+    # Ringkasan teks (diformat dengan better alignment)
+    summary_text = f"""
+        {'='*50}
+        📊 STATISTIK SURVEY KEPUASAN
+        {'='*50}
+        
+        {'INFORMASI UMUM:':<30}
+        • Total Survey   : {total:>4}
+        • Periode Data   : {(stats.first_ts or 'N/A')[:10]:>10} hingga {(stats.last_ts or 'N/A')[:10]:>10}
+        
+        {'RATA-RATA PENILAIAN:':<30}
+        • Kualitas       : {avg_quality:>6.2f}/5    ({avg_quality/5*100:>6.1f}%)
+        • Ketepatan      : {avg_timeliness:>6.2f}/5    ({avg_timeliness/5*100:>6.1f}%)
+        • Layanan        : {avg_service:>6.2f}/5    ({avg_service/5*100:>6.1f}%)
+        • Kepuasan       : {avg_overall:>6.2f}/10   ({avg_overall/10*100:>6.1f}%)
+        """
+    
+    if stats.distribution:
+        summary_text += f"""
+        {'SEBARAN (P25 / MEDIAN / P75):':<30}
+        """
+        for (f, _), label in zip(RATING_FIELDS, ('Kualitas', 'Ketepatan', 'Layanan', 'Kepuasan')):
+            d = stats.distribution[f]
+            summary_text += f"• {label:<15}: {d['p25']:>4g} / {d['median']:>4g} / {d['p75']:>4g}\n        "
+    
+    summary_text += f"""
+        {'-'*50}
+        {'DISTRIBUSI LOKASI (TOP 5):':<30}
+        """
+    
+    for loc, count in sorted_locations[:5]:
+        percentage = (count / total) * 100
+        loc_display = loc[:25] + "..." if len(loc) > 25 else loc
+        summary_text += f"• {loc_display:<25} : {count:>3} ({percentage:>5.1f}%)\n"
+    
+    if len(sorted_locations) > 5:
+        other_count = total - sum(count for _, count in sorted_locations[:5])
+        other_percentage = (other_count / total) * 100
+        summary_text += f"• {'Lain-lain':<25} : {other_count:>3} ({other_percentage:>5.1f}%)\n"
+    
+    summary_text += f"{'='*50}"
+    return summary_text
+
+class StatsCharts:
+    """Figure chart statistik yang dibuat sekali lalu dipakai ulang.
+    version = SurveyStore.version saat data chart diambil; bila data berubah,
+    update() hanya mengganti tinggi bar dan teks label (set_height/set_text),
+    tanpa membangun ulang figure maupun tight_layout."""
+    CATEGORIES = ['Kualitas', 'Ketepatan', 'Layanan', 'Kepuasan']
+    COLORS = ['#4CAF50', '#2196F3', '#FF9800', '#9C27B0']
+    TOP_LOCATIONS = 10
+    TREND_LABELS = {'day': 'Harian', 'week': 'Mingguan', 'month': 'Bulanan'}
+
+    def __init__(self, stats, version):
+        self.stats, self.version = stats, version
+        self.canvases = {}
+        self.summary_label = None
+        self.fig1 = Figure(figsize=(8, 5), dpi=100)
+        self.ax1 = self.fig1.add_subplot(111)
+        self.fig2 = Figure(figsize=(9, 6), dpi=100)
+        self.ax2 = self.fig2.add_subplot(111)
+        self.fig3 = Figure(figsize=(9, 5), dpi=100)
+        self.ax3 = self.fig3.add_subplot(111)
+        self.trend_bucket = 'week'
+        self.build_ratings(stats)
+        self.build_locations(stats)
+        self.build_trend(stats)
+
+    def build_ratings(self, stats):
+        ax1 = self.ax1
+        max_values = [scale for _, scale in RATING_FIELDS]
+        # Buat bar chart
+        self.bars1 = ax1.bar(self.CATEGORIES, [0] * len(RATING_FIELDS), color=self.COLORS, alpha=0.8)
+        self.labels1 = [ax1.text(bar.get_x() + bar.get_width()/2., 0, '', ha='center', va='bottom', fontsize=9)
+                        for bar in self.bars1]
+        
+        ax1.set_ylabel('Nilai Rata-rata', fontweight='bold')
+        ax1.set_title('RATA-RATA PENILAIAN SURVEY', fontweight='bold', pad=20)
+        ax1.set_ylim(0, max(max_values) * 1.2)
+        ax1.grid(True, alpha=0.3, linestyle='--')
+        
+        for i, max_val in enumerate(max_values):
+            ax1.axhline(y=max_val, xmin=i/len(self.CATEGORIES), xmax=(i+1)/len(self.CATEGORIES), 
+                    color='red', linestyle=':', alpha=0.5, linewidth=1)
+        
+        self.total_text = ax1.text(0.02, 0.98, '', transform=ax1.transAxes,
+                fontsize=9, verticalalignment='top',
+                bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
+        self.update_ratings(stats)
+        self.fig1.tight_layout()
+
+    def update_ratings(self, stats):
+        for bar, label, (f, scale) in zip(self.bars1, self.labels1, RATING_FIELDS):
+            value = stats.mean(f)
+            bar.set_height(value)
+            label.set_y(value + 0.1)
+            label.set_text(f'{value:.2f}\n({value/scale*100:.1f}%)')
+        self.total_text.set_text(f'Total Survey: {stats.total}')
+
+    def build_locations(self, stats):
+        # Dibangun ulang hanya bila jumlah bar lokasi berubah
+        ax2 = self.ax2
+        ax2.clear()
+        self.bars2, self.labels2, self.other_text = [], [], None
+        top_locations = stats.locations[:self.TOP_LOCATIONS]
+        if top_locations:
+            n = len(top_locations)
+            cmap = plt.cm.Blues
+            colors2 = [cmap(i/n) for i in range(n)]
+            
+            self.bars2 = ax2.barh(range(n), [0] * n, color=colors2, alpha=0.8)
+            self.labels2 = [ax2.text(0, bar.get_y() + bar.get_height()/2, '', va='center', fontsize=9)
+                            for bar in self.bars2]
+            
+            ax2.set_xlabel('Jumlah Responden', fontweight='bold')
+            ax2.set_title('DISTRIBUSI RESPONDEN BERDASARKAN LOKASI', fontweight='bold', pad=20)
+            ax2.grid(True, alpha=0.3, axis='x', linestyle='--')
+            
+            self.other_text = ax2.text(0.98, 0.02, '',
+                    transform=ax2.transAxes, fontsize=9,
+                    horizontalalignment='right',
+                    bbox=dict(boxstyle='round', facecolor='lightgray', alpha=0.7))
+            self.loc_names = None
+            self.update_locations(stats)
+        else:
+            ax2.text(0.5, 0.5, 'Tidak ada data lokasi',
+                    horizontalalignment='center', verticalalignment='center',
+                    transform=ax2.transAxes, fontsize=12)
+        self.fig2.tight_layout()
+
+    def update_locations(self, stats):
+        total = stats.total
+        top_locations = stats.locations[:self.TOP_LOCATIONS]
+        loc_names = [loc[:20] + '...' if len(loc) > 20 else loc for loc, _ in top_locations]
+        loc_counts = [count for _, count in top_locations]
+        for bar, label, count in zip(self.bars2, self.labels2, loc_counts):
+            bar.set_width(count)
+            label.set_x(count + max(loc_counts)*0.01)
+            label.set_text(f'{count} ({(count/total*100):.1f}%)')
+        
+        other_count = total - sum(loc_counts)
+        self.other_text.set_text(f'Lainnya: {other_count} responden')
+        self.other_text.set_visible(other_count > 0)
+        
+        self.ax2.relim()
+        self.ax2.autoscale_view()
+        if loc_names != self.loc_names:
+            self.ax2.set_yticks(range(len(loc_names)), loc_names)
+            self.loc_names = loc_names
+            return True
+        return False
+
+    def build_trend(self, stats):
+        # Garis rata-rata bergulir (persen dari skala) per penilaian + jumlah responden per ember
+        ax3 = self.ax3
+        ax3.xaxis_date()
+        self.trend_lines = {f: ax3.plot([], [], color=color, linewidth=1.6, label=label)[0]
+                            for (f, _), color, label in zip(RATING_FIELDS, self.COLORS, self.CATEGORIES)}
+        ax3.set_ylabel('Rata-rata bergulir (% skala)', fontweight='bold')
+        ax3.set_ylim(0, 105)
+        ax3.grid(True, alpha=0.3, linestyle='--')
+        ax3.legend(loc='lower left', fontsize=8, ncol=4)
+        self.ax3b = ax3.twinx()
+        self.count_line = self.ax3b.plot([], [], color='#90a4ae', drawstyle='steps-mid',
+                                         alpha=0.6, linewidth=1)[0]
+        self.ax3b.set_ylabel('Jumlah responden', color='#607d8b')
+        self.update_trend(stats)
+        self.fig3.autofmt_xdate()
+        self.fig3.tight_layout()
+
+    def update_trend(self, stats):
+        buckets, xs = [], []
+        for b in stats.trends.get(self.trend_bucket, []):
+            try:
+                xs.append(datetime.strptime(b['bucket'], '%Y-%m-%d'))
+            except (TypeError, ValueError):
+                continue  # ember rusak jangan sampai menggagalkan seluruh window statistik
+            buckets.append(b)
+        for f, scale in RATING_FIELDS:
+            self.trend_lines[f].set_data(xs, [(b['rolling'][f] or 0) / scale * 100 for b in buckets])
+        self.count_line.set_data(xs, [b['n'] for b in buckets])
+        window = SimpleDB.TREND_BUCKETS[self.trend_bucket][1]
+        self.ax3.set_title(f"TREN {self.TREND_LABELS[self.trend_bucket].upper()} "
+                           f"(rata-rata bergulir {window} periode)", fontweight='bold', pad=20)
+        if len(xs) > 1:
+            self.ax3.set_xlim(xs[0], xs[-1])
+        if buckets:
+            self.ax3b.set_ylim(0, max(b['n'] for b in buckets) * 1.15)
+
+    def set_trend_bucket(self, bucket):
+        self.trend_bucket = bucket
+        self.update_trend(self.stats)
+        self.redraw(self.fig3)
+
+    def update(self, stats, version):
+        """Terapkan hanya bagian yang berubah; kembalikan False bila tidak ada yang berubah"""
+        old = self.stats
+        ratings_changed = [old.mean(f) for f, _ in RATING_FIELDS] != [stats.mean(f) for f, _ in RATING_FIELDS]
+        top = stats.locations[:self.TOP_LOCATIONS]
+        locations_changed = old.locations[:self.TOP_LOCATIONS] != top or old.total != stats.total
+        trend_changed = old.trends != stats.trends
+        # Teks ringkasan juga memuat min/max/sd, periode data dan persentil
+        summary_changed = ((old.first_ts, old.last_ts) != (stats.first_ts, stats.last_ts)
+                           or old.ratings != stats.ratings or old.distribution != stats.distribution)
+        self.stats, self.version = stats, version
+        if not (ratings_changed or locations_changed or trend_changed or summary_changed):
+            return False
+        
+        if ratings_changed or old.total != stats.total:
+            self.update_ratings(stats)
+            self.redraw(self.fig1)
+        if locations_changed:
+            if len(top) != len(self.bars2):
+                self.build_locations(stats)
+            elif self.update_locations(stats):
+                self.fig2.tight_layout()  # nama lokasi berganti, lebar label sumbu bisa berubah
+            self.redraw(self.fig2)
+        if trend_changed:
+            self.update_trend(stats)
+            self.redraw(self.fig3)
+        if self.summary_label is not None:
+            self.summary_label.config(text=stats_summary_text(stats))
+        return True
+
+    def attach(self, fig, master):
+        canvas = FigureCanvasTkAgg(fig, master=master)
+        canvas.draw()
+        canvas.get_tk_widget().pack(expand=True)
+        
+        # Toolbar untuk interaksi
+        toolbar = NavigationToolbar2Tk(canvas, master)
+        toolbar.update()
+        toolbar.pack(side='bottom', fill='x')
+        self.canvases[fig] = canvas
+
+    def redraw(self, fig):
+        canvas = self.canvases.get(fig)
+        if canvas is not None:
+            canvas.draw_idle()
+
+    def detach(self):
+        # Window ditutup; figure tetap disimpan untuk dibuka lagi
+        self.canvases = {}
+        self.summary_label = None
+
 # ------------------ MAIN APP CLASS ------------------
 class SurveyApp:
+    LIVE_POLL_MS = 2000
+
     def __init__(self, root):
         self.root = root
         self.root.title(APP_TITLE)
@@ -321,7 +2531,17 @@ class SurveyApp:
         self.setup_initial_window()
         self.db = SimpleDB()
         self.current_user = None
-        self.surveys = []
+        self.store = SurveyStore(self.db)
+        self.store.subscribe(self.on_store_change)
+        self.tasks = set()
+        self.table = None
+        self.search_term = ''
+        self.charts = None
+        self.stats_window = None
+        self.stats_refresh_job = None
+        self.live_job = None
+        self.snapshot = None
+        self.stats_future = None
         self.deleted = deque(maxlen=50)
         self.form_vars = {}
         self.editing_id = None
@@ -672,6 +2892,8 @@ class SurveyApp:
     def build_main_app(self):
         for w in self.root.winfo_children(): 
             w.destroy()
+        self.table = None
+        warm_imports()
         
         self.root.unbind('<Return>')
         self.root.geometry("1300x750")
@@ -892,7 +3114,7 @@ class SurveyApp:
             
             ttk.Button(search_frame,
                       text="🔍 Cari",
-                      command=self.refresh_list,
+                      command=self.search,
                       width=10).pack(side='left', padx=(0, 5))
             
             ttk.Button(search_frame,
@@ -914,30 +3136,18 @@ class SurveyApp:
                            fieldbackground="white")
             style.map('Treeview', background=[('selected', '#1a237e')])
             
-            self.tree = ttk.Treeview(tree_container, columns=columns, show='headings', height=15)
-            
             column_widths = {
                 "ID": 80, "Tanggal": 150, "Nama": 120, "Email": 160,
                 "Lokasi": 100, "Quality": 70, "Timeliness": 85,
                 "Service": 70, "Overall": 70, "Komentar": 200
             }
             
-            for col in columns:
-                self.tree.heading(col, text=col)
-                width = column_widths.get(col, 100)
-                self.tree.column(col, width=width, minwidth=50)
-            
-            vsb = ttk.Scrollbar(tree_container, orient='vertical', command=self.tree.yview)
-            hsb = ttk.Scrollbar(tree_container, orient='horizontal', command=self.tree.xview)
-            
-            self.tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
-            
-            self.tree.grid(row=0, column=0, sticky='nsew')
-            vsb.grid(row=0, column=1, sticky='ns')
-            hsb.grid(row=1, column=0, sticky='ew')
-            
-            tree_container.grid_rowconfigure(0, weight=1)
-            tree_container.grid_columnconfigure(0, weight=1)
+            # Hanya baris yang terlihat yang dibuat; data diambil per halaman saat di-scroll
+            self.table = VirtualTable(tree_container, columns, column_widths,
+                                      row_count=lambda: self.store.total,
+                                      get_rows=self.store.window,
+                                      format_row=self.format_tree_row)
+            self.tree = self.table.tree
             
             self.tree.bind("<Double-1>", lambda e: self.on_row_double())
             
@@ -952,6 +3162,7 @@ class SurveyApp:
                 ("↩️ Undo", self.undo_delete),
                 ("📄 Export PDF", self.export_pdf),
                 ("📊 Statistik", self.show_stats),
+                ("📂 Import Data", self.import_file),
             ]
             
             for idx, (text, command) in enumerate(action_buttons):
@@ -1020,11 +3231,17 @@ Silakan gunakan form di sebelah kiri untuk mengisi survey.
             self.refresh_list()
 
     def load_surveys(self):
+        """Muat ulang halaman pertama sesuai pencarian aktif; halaman lain diambil saat di-scroll"""
         try:
-            self.surveys = self.db.get_all_surveys()
+            self.store.reload(self.search_term)
         except Exception as e:
             messagebox.showerror("Error", f"Gagal memuat data: {str(e)}")
-            self.surveys = []
+
+    def on_store_change(self, action, row):
+        # Perubahan satu baris cukup menggambar ulang viewport tabel
+        self.refresh_list(reset=(action == 'reload'))
+        if self.stats_window and not self.stats_refresh_job:
+            self.stats_refresh_job = self.root.after(300, self.refresh_stats_window)
 
     def is_admin(self):
         return self.current_user and int(self.current_user.get('is_admin', 0)) == 1
@@ -1088,9 +3305,8 @@ Silakan gunakan form di sebelah kiri untuk mengisi survey.
             payload['timestamp'] = now_ts()
             if self.db.update_survey(self.editing_id, payload):
                 messagebox.showinfo("Sukses", "Data berhasil diperbarui")
+                self.store.update(self.db.get_survey(self.editing_id))
                 self.editing_id = None
-                self.load_surveys()
-                self.refresh_list()
                 self.reset_form()
             else:
                 messagebox.showerror("Error", "Gagal memperbarui data")
@@ -1098,9 +3314,7 @@ Silakan gunakan form di sebelah kiri untuk mengisi survey.
 
         if self.db.save_survey(payload):
             messagebox.showinfo("Sukses", "Survey berhasil disimpan")
-            self.load_surveys()
-            if self.is_admin():
-                self.refresh_list()
+            self.store.insert(self.db.get_survey(payload['id']))
             self.reset_form()
         else:
             messagebox.showerror("Error", "Gagal menyimpan survey")
@@ -1134,53 +3348,81 @@ Silakan gunakan form di sebelah kiri untuk mengisi survey.
             self.comments.delete('1.0', 'end')
             self.comments.insert('1.0', "Pelayanan sangat memuaskan, akan saya nikmati sendiri aja.")
 
-    def refresh_list(self):
-        if not hasattr(self, 'tree'): return
-        
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+    def import_file(self):
+        if not self.is_admin():
+            messagebox.showerror("Error", "Hanya admin yang dapat mengimpor data")
+            return
         
-        search_term = self.search_var.get().strip().lower()
-        filtered = []
+        filename = filedialog.askopenfilename(
+            filetypes=[("Data Survey", "*.csv *.json *.jsonl"), ("All Files", "*.*")],
+            title="Import Data Survey"
+        )
+        if not filename: return
         
-        if self.is_admin():
-            for survey in self.surveys:
-                match = True
-                if search_term:
-                    fields = [
-                        survey.get('customer_name', '').lower(),
-                        survey.get('customer_email', '').lower(),
-                        survey.get('customer_location', '').lower(),
-                        survey.get('comments', '').lower()
-                    ]
-                    if not any(search_term in field for field in fields):
-                        match = False
-                if match:
-                    filtered.append(survey)
-        
-        for survey in filtered:
-            comment = (survey.get('comments', '') or '')[:100]
-            if len(survey.get('comments', '')) > 100:
-                comment += "..."
-            
-            values = (
-                survey.get('id', '')[:8],
-                survey.get('timestamp', '')[:19],
-                survey.get('customer_name', ''),
-                survey.get('customer_email', '') or '',
-                survey.get('customer_location', '') or '',
-                survey.get('quality') or 0,
-                survey.get('timeliness') or 0,
-                survey.get('service') or 0,
-                survey.get('overall') or 0,
-                comment
-            )
-            self.tree.insert('', 'end', values=values, tags=(survey.get('id', ''),))
+        owner = self.current_user['username']
+        self.run_task("Import data",
+                      lambda progress: import_surveys(self.db, filename, owner_username=owner, progress=progress),
+                      on_done=self.on_import_done,
+                      on_error=lambda e: messagebox.showerror("❌ Gagal Import", f"Terjadi kesalahan:\n\n{str(e)}"),
+                      on_cancel=self.on_import_cancelled)
+
+    def run_task(self, title, fn, on_done, on_error=None, on_cancel=None):
+        task = BackgroundTask(self.root, title, fn, on_done, on_error=on_error, on_cancel=on_cancel)
+        task.on_finish = lambda: self.tasks.discard(task)
+        self.tasks.add(task)
+        return task
+
+    def cancel_tasks(self):
+        for task in list(self.tasks):
+            task.cancelled.set()
+
+    def on_import_done(self, result, title="Import Selesai", note=""):
+        inserted, errors = result
+        message = f"{note}Data masuk: {inserted}\nData ditolak: {len(errors)}"
+        if errors:
+            message += "\n\n" + "\n".join(f"Baris {n}: {msg}" for n, msg in errors[:10])
+            if len(errors) > 10:
+                message += f"\n... dan {len(errors) - 10} lainnya"
+        messagebox.showinfo(title, message)
+        self.load_surveys()
+
+    def on_import_cancelled(self, partial):
+        if partial is None:
+            self.load_surveys()
+            return
+        self.on_import_done(partial, title="Import Dibatalkan",
+                            note="Import dibatalkan. Data yang sudah masuk tetap tersimpan.\n\n")
+
+    def refresh_list(self, reset=False):
+        if not self.table or not self.is_admin(): return
+        self.table.refresh(reset)
+
+    def format_tree_row(self, survey):
+        # Cukup pratinjau komentar; teks lengkap tidak diambil dari database
+        preview = survey.comment_preview or ''
+        comment = preview[:100] + "..." if len(preview) > 100 else preview
+        
+        return (
+            survey.get('id', '')[:8],
+            survey.get('timestamp', '')[:19],
+            survey.get('customer_name', ''),
+            survey.get('customer_email', '') or '',
+            survey.get('customer_location', '') or '',
+            survey.get('quality') or 0,
+            survey.get('timeliness') or 0,
+            survey.get('service') or 0,
+            survey.get('overall') or 0,
+            comment
+        )
+
+    def search(self):
+        self.search_term = self.search_var.get().strip() if hasattr(self, 'search_var') else ''
+        self.load_surveys()
 
     def reset_search(self):
         if hasattr(self, 'search_var'):
             self.search_var.set('')
-        self.refresh_list()
+        self.search()
 
     def on_row_double(self):
         self.edit_selected()
@@ -1195,8 +3437,7 @@ Silakan gunakan form di sebelah kiri untuk mengisi survey.
             messagebox.showinfo("Info", "Pilih data yang akan diedit")
             return
         
-        item_id = self.tree.item(selection[0])['tags'][0]
-        survey = next((s for s in self.surveys if s['id'] == item_id), None)
+        survey = self.table.row_of(selection[0]) or self.store.get(self.tree.item(selection[0])['tags'][0])
         
         if not survey:
             messagebox.showerror("Error", "Data tidak ditemukan")
@@ -1228,21 +3469,22 @@ Silakan gunakan form di sebelah kiri untuk mengisi survey.
             messagebox.showinfo("Info", "Pilih data yang akan dihapus")
             return
         
-        item_id = self.tree.item(selection[0])['tags'][0]
-        survey = next((s for s in self.surveys if s['id'] == item_id), None)
+        survey = self.table.row_of(selection[0]) or self.store.get(self.tree.item(selection[0])['tags'][0])
         
         if not survey:
             messagebox.showerror("Error", "Data tidak ditemukan")
             return
+        item_id = survey['id']
         
         if not messagebox.askyesno("Konfirmasi", "Apakah Anda yakin ingin menghapus data ini?"):
             return
         
+        # Salinan lengkap (termasuk komentar) diambil sebelum baris hilang dari database
+        survey = dict(survey)
         if self.db.delete_survey(item_id):
             self.deleted.append(survey)
             messagebox.showinfo("Sukses", "Data berhasil dihapus")
-            self.load_surveys()
-            self.refresh_list()
+            self.store.remove(item_id)
         else:
             messagebox.showerror("Error", "Gagal menghapus data")
 
@@ -1255,8 +3497,7 @@ Silakan gunakan form di sebelah kiri untuk mengisi survey.
         try:
             if self.db.save_survey(survey):
                 messagebox.showinfo("Sukses", "Data berhasil dikembalikan")
-                self.load_surveys()
-                self.refresh_list()
+                self.store.insert(self.db.get_survey(survey['id']))
             else:
                 messagebox.showerror("Error", "Gagal mengembalikan data")
         except Exception as e:
@@ -1267,7 +3508,8 @@ Silakan gunakan form di sebelah kiri untuk mengisi survey.
             messagebox.showerror("Error", "Hanya admin yang dapat mengekspor data")
             return
         
-        if not self.surveys:
+        total_records = self.db.count_surveys()
+        if not total_records:
             messagebox.showwarning("Peringatan", "Tidak ada data untuk diekspor")
             return
         
@@ -1279,17 +3521,32 @@ Silakan gunakan form di sebelah kiri untuk mengisi survey.
         
         if not filename: return
         
+        footer_info = {'user': self.current_user['full_name'], 'total_records': total_records}
+        
+        def cancelled(_partial):
+            if os.path.exists(filename):
+                try:
+                    os.remove(filename)
+                except OSError:
+                    pass
+        
+        self.run_task("Membuat PDF",
+                      lambda progress: make_pdf_sharded(filename, self.db, footer_info=footer_info,
+                                                        stats=self.current_stats(), progress=progress),
+                      on_done=lambda result: self.on_pdf_done(filename, total_records, result),
+                      on_cancel=cancelled)
+
+    def on_pdf_done(self, filename, total_records, result):
         try:
-            footer_info = {'user': self.current_user['full_name'], 'total_records': len(self.surveys)}
-            success, error = make_pdf_reportlab(filename, self.surveys, footer_info=footer_info)
+            success, error = result
             
             if success:
-                total_surveys = min(50, len(self.surveys))
+                total_surveys = total_records
                 surveys_per_page = 4
                 total_pages = ((total_surveys + surveys_per_page - 1) // surveys_per_page) + 1
                 
                 if messagebox.askyesno("✅ PDF Berhasil Dibuat", 
-                    f"Laporan PDF berhasil dibuat!\n\nTotal Responden: {len(self.surveys)}\nTotal Halaman: {total_pages}\n\nApakah Anda ingin membuka file PDF?"):
+                    f"Laporan PDF berhasil dibuat!\n\nTotal Responden: {total_records}\nTotal Halaman: {total_pages}\n\nApakah Anda ingin membuka file PDF?"):
                     try:
                         import platform, subprocess
                         system = platform.system()
@@ -1311,33 +3568,53 @@ Silakan gunakan form di sebelah kiri untuk mengisi survey.
             messagebox.showerror("Error", "Hanya admin yang dapat melihat statistik")
             return
         
-        if not self.surveys:
-            messagebox.showinfo("Statistik", "Belum ada data survey")
+        if self.stats_window:
+            self.stats_window.lift()
+            return
+        marker = self.data_marker()
+        if self.charts and self.charts.version == marker:
+            # Data belum berubah sejak chart terakhir: pakai ulang tanpa query maupun render ulang
+            self.build_stats_window(self.charts.stats, marker)
             return
         
-        # Hitung statistik dasar
-        total = len(self.surveys)
-        avg_quality = sum(s.get('quality', 0) for s in self.surveys) / total
-        avg_timeliness = sum(s.get('timeliness', 0) for s in self.surveys) / total
-        avg_service = sum(s.get('service', 0) for s in self.surveys) / total
-        avg_overall = sum(s.get('overall', 0) for s in self.surveys) / total
-        
-        # Hitung distribusi lokasi (ambil 10 lokasi terbanyak)
-        locations = {}
-        for survey in self.surveys:
-            loc = survey.get('customer_location', 'Tidak diketahui').strip()
-            if not loc:
-                loc = 'Tidak diketahui'
-            locations[loc] = locations.get(loc, 0) + 1
+        # Statistik dihitung di SQLite dari seluruh data, bukan hanya halaman yang sudah dimuat;
+        # matplotlib ikut diimpor di thread pekerja bila belum dimuat warm_imports()
+        def compute(progress):
+            load_charts()
+            return self.current_stats()
+        self.run_task("Menghitung statistik", compute,
+                      on_done=lambda stats: self.build_stats_window(stats, marker))
+
+    def current_stats(self):
+        # Dipanggil di thread pekerja. Snapshot NumPy disimpan antar panggilan sehingga
+        # hanya baris baru yang dimuat; tanpa NumPy kembali ke tabel ringkasan.
+        if self.snapshot is None:
+            try:
+                self.snapshot = RatingSnapshot()
+            except ImportError:
+                return SurveyStats.from_db(self.db)
+        return SurveyStats.from_snapshot(self.db, self.snapshot)
+
+    def data_marker(self):
+        # Perubahan dari aplikasi ini tercatat di store.version, dari koneksi/proses lain di data_version
+        return (self.store.version, self.db.data_version())
+
+    def build_stats_window(self, stats, marker):
+        if not stats.total:
+            messagebox.showinfo("Statistik", "Belum ada data survey")
+            return
         
-        # Urutkan berdasarkan jumlah (descending)
-        sorted_locations = sorted(locations.items(), key=lambda x: x[1], reverse=True)
-        top_locations = sorted_locations[:10]
+        # Figure dibuat sekali; bila data berubah sejak terakhir, cukup perbarui artist-nya
+        if self.charts is None:
+            self.charts = StatsCharts(stats, marker)
+        elif self.charts.version != marker:
+            self.charts.update(stats, marker)
         
         # Buat window statistik baru
         stats_window = tk.Toplevel(self.root)
         stats_window.title("📈 Statistik Survey dengan Chart")
         stats_window.geometry("1000x700")
+        self.stats_window = stats_window
         
         # Posisikan di tengah layar
         x = self.root.winfo_x() + (self.root.winfo_width() // 2) - (1000 // 2)
@@ -1360,6 +3637,13 @@ Silakan gunakan form di sebelah kiri untuk mengisi survey.
         ttk.Button(button_container, text="Tutup", 
                 command=stats_window.destroy).pack(side='left', padx=5)
         
+        # Mode live untuk layar dashboard: cek penanda perubahan tiap LIVE_POLL_MS
+        self.live_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(button_container, text="🔴 Live", variable=self.live_var,
+                        command=self.toggle_live).pack(side='left', padx=5)
+        self.live_label = tk.Label(button_container, text="", fg='#607d8b')
+        self.live_label.pack(side='left', padx=5)
+        
         # Notebook untuk tab berbeda
         notebook = ttk.Notebook(main_frame)
         notebook.pack(fill='both', expand=True)
@@ -1376,42 +3660,11 @@ Silakan gunakan form di sebelah kiri untuk mengisi survey.
         center_frame = tk.Frame(summary_container, bg='white')
         center_frame.place(relx=0.5, rely=0.5, anchor="center")
         
-        # Ringkasan teks (diformat dengan better alignment)
-        summary_text = f"""
-        {'='*50}
-        📊 STATISTIK SURVEY KEPUASAN
-        {'='*50}
-        
-        {'INFORMASI UMUM:':<30}
-        • Total Survey   : {total:>4}
-        • Periode Data   : {self.surveys[-1].get('timestamp', '')[:10] if self.surveys else 'N/A':>10} hingga {self.surveys[0].get('timestamp', '')[:10] if self.surveys else 'N/A':>10}
-        
-        {'RATA-RATA PENILAIAN:':<30}
-        • Kualitas       : {avg_quality:>6.2f}/5    ({avg_quality/5*100:>6.1f}%)
-        • Ketepatan      : {avg_timeliness:>6.2f}/5    ({avg_timeliness/5*100:>6.1f}%)
-        • Layanan        : {avg_service:>6.2f}/5    ({avg_service/5*100:>6.1f}%)
-        • Kepuasan       : {avg_overall:>6.2f}/10   ({avg_overall/10*100:>6.1f}%)
-        
-        {'-'*50}
-        {'DISTRIBUSI LOKASI (TOP 5):':<30}
-        """
-        
-        for loc, count in sorted_locations[:5]:
-            percentage = (count / total) * 100
-            loc_display = loc[:25] + "..." if len(loc) > 25 else loc
-            summary_text += f"• {loc_display:<25} : {count:>3} ({percentage:>5.1f}%)\n"
-        
-        if len(sorted_locations) > 5:
-            other_count = total - sum(count for _, count in sorted_locations[:5])
-            other_percentage = (other_count / total) * 100
-            summary_text += f"• {'Lain-lain':<25} : {other_count:>3} ({other_percentage:>5.1f}%)\n"
-        
-        summary_text += f"{'='*50}"
-        
         # Buat label dengan font monospace untuk alignment yang baik
-        summary_label = tk.Label(center_frame, text=summary_text, font=("Courier", 10), 
+        summary_label = tk.Label(center_frame, text=stats_summary_text(stats), font=("Courier", 10), 
                                 justify='left', bg='white', padx=20, pady=20)
         summary_label.pack()
+        self.charts.summary_label = summary_label
         
         # Tab 2: Chart Rata-rata Penilaian
         ratings_tab = ttk.Frame(notebook)
@@ -1420,49 +3673,7 @@ Silakan gunakan form di sebelah kiri untuk mengisi survey.
         # Container untuk menengahkan chart
         chart1_container = tk.Frame(ratings_tab)
         chart1_container.pack(fill='both', expand=True)
-        
-        # Buat figure untuk chart rata-rata penilaian
-        fig1 = Figure(figsize=(8, 5), dpi=100)
-        ax1 = fig1.add_subplot(111)
-        
-        categories = ['Kualitas', 'Ketepatan', 'Layanan', 'Kepuasan']
-        values = [avg_quality, avg_timeliness, avg_service, avg_overall]
-        max_values = [5, 5, 5, 10]
-        percentages = [(v/max_val)*100 for v, max_val in zip(values, max_values)]
-        
-        colors = ['#4CAF50', '#2196F3', '#FF9800', '#9C27B0']
-        
-        # Buat bar chart
-        bars = ax1.bar(categories, values, color=colors, alpha=0.8)
-        
-        for bar, value, percentage in zip(bars, values, percentages):
-            height = bar.get_height()
-            ax1.text(bar.get_x() + bar.get_width()/2., height + 0.1,
-                    f'{value:.2f}\n({percentage:.1f}%)',
-                    ha='center', va='bottom', fontsize=9)
-        
-        ax1.set_ylabel('Nilai Rata-rata', fontweight='bold')
-        ax1.set_title('RATA-RATA PENILAIAN SURVEY', fontweight='bold', pad=20)
-        ax1.set_ylim(0, max(max_values) * 1.2)
-        ax1.grid(True, alpha=0.3, linestyle='--')
-        
-        for i, max_val in enumerate(max_values):
-            ax1.axhline(y=max_val, xmin=i/len(categories), xmax=(i+1)/len(categories), 
-                    color='red', linestyle=':', alpha=0.5, linewidth=1)
-        
-        ax1.text(0.02, 0.98, f'Total Survey: {total}', transform=ax1.transAxes,
-                fontsize=9, verticalalignment='top',
-                bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
-        
-        fig1.tight_layout()
-        
-        canvas1 = FigureCanvasTkAgg(fig1, master=chart1_container)
-        canvas1.draw()
-        canvas1.get_tk_widget().pack(expand=True)
-        
-        toolbar1 = NavigationToolbar2Tk(canvas1, chart1_container)
-        toolbar1.update()
-        toolbar1.pack(side='bottom', fill='x')
+        self.charts.attach(self.charts.fig1, chart1_container)
         
         # Tab 3: Chart Distribusi Lokasi
         locations_tab = ttk.Frame(notebook)
@@ -1471,51 +3682,71 @@ Silakan gunakan form di sebelah kiri untuk mengisi survey.
         # Container untuk menengahkan chart
         chart2_container = tk.Frame(locations_tab)
         chart2_container.pack(fill='both', expand=True)
+        self.charts.attach(self.charts.fig2, chart2_container)
         
-        fig2 = Figure(figsize=(9, 6), dpi=100)
-        ax2 = fig2.add_subplot(111)
+        # Tab 4: Tren per periode
+        trend_tab = ttk.Frame(notebook)
+        notebook.add(trend_tab, text="📉 Tren")
         
-        if top_locations:
-            loc_names = [loc[:20] + '...' if len(loc) > 20 else loc for loc, _ in top_locations]
-            loc_counts = [count for _, count in top_locations]
-            
-            cmap = plt.cm.Blues
-            colors2 = [cmap(i/len(loc_names)) for i in range(len(loc_names))]
-            
-            bars2 = ax2.barh(loc_names, loc_counts, color=colors2, alpha=0.8)
-            
-            for bar, count in zip(bars2, loc_counts):
-                width = bar.get_width()
-                ax2.text(width + max(loc_counts)*0.01, bar.get_y() + bar.get_height()/2,
-                        f'{count} ({(count/total*100):.1f}%)',
-                        va='center', fontsize=9)
-            
-            ax2.set_xlabel('Jumlah Responden', fontweight='bold')
-            ax2.set_title('DISTRIBUSI RESPONDEN BERDASARKAN LOKASI', fontweight='bold', pad=20)
-            ax2.grid(True, alpha=0.3, axis='x', linestyle='--')
-            
-            other_count = total - sum(loc_counts)
-            if other_count > 0:
-                ax2.text(0.98, 0.02, f'Lainnya: {other_count} responden',
-                        transform=ax2.transAxes, fontsize=9,
-                        horizontalalignment='right',
-                        bbox=dict(boxstyle='round', facecolor='lightgray', alpha=0.7))
-        else:
-            ax2.text(0.5, 0.5, 'Tidak ada data lokasi',
-                    horizontalalignment='center', verticalalignment='center',
-                    transform=ax2.transAxes, fontsize=12)
+        bucket_frame = tk.Frame(trend_tab)
+        bucket_frame.pack(fill='x', pady=5)
+        labels = StatsCharts.TREND_LABELS
+        bucket_var = tk.StringVar(value=labels[self.charts.trend_bucket])
+        for bucket, label in labels.items():
+            ttk.Radiobutton(bucket_frame, text=label, value=label, variable=bucket_var,
+                            command=lambda b=bucket: self.charts.set_trend_bucket(b)).pack(side='left', padx=5)
         
-        fig2.tight_layout()
+        chart3_container = tk.Frame(trend_tab)
+        chart3_container.pack(fill='both', expand=True)
+        self.charts.attach(self.charts.fig3, chart3_container)
         
-        # Embed chart ke Tkinter
-        canvas2 = FigureCanvasTkAgg(fig2, master=chart2_container)
-        canvas2.draw()
-        canvas2.get_tk_widget().pack(expand=True)
-        
-        # Toolbar untuk interaksi
-        toolbar2 = NavigationToolbar2Tk(canvas2, chart2_container)
-        toolbar2.update()
-        toolbar2.pack(side='bottom', fill='x')
+        stats_window.bind('<Destroy>', lambda e: self.on_stats_closed(e, stats_window))
+
+    def on_stats_closed(self, event, window):
+        if event.widget is window and self.stats_window is window:
+            self.stats_window = None
+            self.charts.detach()
+            if self.live_job:
+                self.root.after_cancel(self.live_job)
+                self.live_job = None
+
+    def refresh_stats_window(self):
+        # Dipanggil (di-debounce) setelah data berubah selama window statistik terbuka,
+        # dan tiap tick mode live. Tanpa perubahan penanda, tidak ada query sama sekali.
+        self.stats_refresh_job = None
+        if not self.stats_window:
+            return
+        marker = self.data_marker()
+        if self.charts.version == marker or self.stats_future:
+            return
+        # Snapshot biasanya hanya menambah baris baru, tapi setelah edit/hapus dibangun
+        # ulang; jalankan di thread pekerja agar window tetap responsif
+        self.stats_future = worker_pool().submit(self.current_stats)
+        self.root.after(50, self.apply_stats_refresh, marker)
+
+    def apply_stats_refresh(self, marker):
+        if not self.stats_future.done():
+            self.root.after(50, self.apply_stats_refresh, marker)
+            return
+        future, self.stats_future = self.stats_future, None
+        if not self.stats_window or future.exception():
+            return
+        stats = future.result()
+        if stats.total and self.charts.update(stats, marker):
+            self.live_label.config(text=f"diperbarui {datetime.now().strftime('%H:%M:%S')}")
+
+    def toggle_live(self):
+        if self.live_var.get():
+            if not self.live_job:
+                self.live_tick()
+        elif self.live_job:
+            self.root.after_cancel(self.live_job)
+            self.live_job = None
+            self.live_label.config(text="")
+
+    def live_tick(self):
+        self.refresh_stats_window()
+        self.live_job = self.root.after(self.LIVE_POLL_MS, self.live_tick)
 
     def open_admin_dashboard(self):
         if not self.is_admin():
@@ -1551,9 +3782,194 @@ Silakan gunakan form di sebelah kiri untuk mengisi survey.
     def logout(self):
         if messagebox.askyesno("Konfirmasi", "Apakah Anda yakin ingin logout?"):
             self.current_user = None
+            self.search_term = ''
+            self.table = None
             self.show_login_page()
 
+# ==================================================
+# CLI (tanpa GUI)
+# ==================================================
+def cli_export(db, args):
+    stats = SurveyStats.from_db(db)
+    if not stats.total:
+        print(f"{db.path}: tidak ada data untuk diekspor", file=sys.stderr)
+        return 1
+    path = cli_output_path(args.output, db.path)
+    ok, error = make_pdf_sharded(path, db, footer_info={'user': args.user, 'total_records': stats.total},
+                                 stats=stats, workers=args.workers)
+    if not ok:
+        print(f"{db.path}: {error}", file=sys.stderr)
+        return 1
+    print(f"{db.path}: {stats.total} responden -> {path}")
+    return 0
+
+def cli_memory(db, args):
+    result = benchmark_memory(db, args.rows)
+    if not result:
+        print(f"{db.path}: belum ada data")
+        return 0
+    print(f"{db.path}: {result['rows']} baris — dict {result['dict_bytes']:.0f} B/baris, "
+          f"SurveyRecord {result['record_bytes']:.0f} B/baris (hemat {result['saved_pct']:.0f}%)")
+    return 0
+
+def cli_pdf(db, args):
+    result = benchmark_pdf(db, args.rows)
+    if not result:
+        print(f"{db.path}: belum ada data")
+        return 0
+    print(f"{db.path}: {result['rows']} baris — parse markup {result['parse_ms']:.2f} ms/baris, "
+          f"template {result['template_ms']:.2f} ms/baris, PDF utuh {result['pdf_ms']:.2f} ms/baris")
+    return 0
+
+def cli_locations(db, args):
+    if args.merge:
+        target, *variants = args.merge
+        moved = db.merge_locations(target, variants)
+        print(f"{db.path}: {', '.join(variants)} -> {location_label(target)} ({moved} survey dipindah)")
+        return 0
+    print(f"{db.path}:")
+    for name, n, variants in db.list_locations():
+        print(f"  {name}: {n}" + (f"  (juga: {', '.join(variants)})" if variants else ""))
+    return 0
+
+def cli_output_path(template, db_path):
+    name = os.path.splitext(os.path.basename(db_path))[0]
+    return template.format(db=name, date=datetime.now().strftime('%Y%m%d'))
+
+def cli_stats(db, args):
+    period = (args.since, args.until)
+    stats = SurveyStats.from_db(db, filters={'period': period} if any(period) else None)
+    if args.json:
+        print(json.dumps({'database': db.path, 'total': stats.total, 'first': stats.first_ts,
+                          'last': stats.last_ts, 'ratings': stats.ratings,
+                          'locations': dict(stats.locations)}, ensure_ascii=False))
+        return 0
+    print(f"{db.path}: {stats.total} responden ({(stats.first_ts or 'N/A')[:10]} - {(stats.last_ts or 'N/A')[:10]})")
+    for f, r in stats.ratings.items():
+        print(f"  {f:<11}{r['mean']:6.2f}/{r['scale']}  min {r['min']}  max {r['max']}  sd {r['std']:.2f}")
+    for loc, n in stats.locations[:args.top]:
+        print(f"  {loc}: {n}")
+    return 0
+
+def cli_import(db, args):
+    status = 0
+    for path in args.files:
+        t0 = time.perf_counter()
+        inserted, errors = import_surveys(db, path, owner_username=args.owner)
+        elapsed = time.perf_counter() - t0
+        print(f"{path}: {inserted} masuk, {len(errors)} ditolak ({inserted / max(elapsed, 1e-9):.0f} baris/detik)")
+        for n, msg in errors:
+            print(f"  baris {n}: {msg}", file=sys.stderr)
+        status = status or (1 if errors else 0)
+    return status
+
+def cli_vacuum(db, args):
+    before = os.path.getsize(db.path)
+    db.vacuum()
+    print(f"{db.path}: {before / 1048576:.1f} MB -> {os.path.getsize(db.path) / 1048576:.1f} MB")
+    return 0
+
+CLI_COMMANDS = {'export': cli_export, 'stats': cli_stats, 'import': cli_import, 'vacuum': cli_vacuum,
+                'memory': cli_memory, 'pdf': cli_pdf, 'locations': cli_locations}
+
+def cli_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--db', action='append', dest='databases', metavar='PATH',
+                        help="file database (boleh diulang; bawaan survey_app.db)")
+    common.add_argument('-j', '--jobs', type=int, default=1,
+                        help="jumlah database yang diproses bersamaan")
+    common.add_argument('--timings', action='store_true',
+                        help="tampilkan jumlah dan waktu query SQLite per database (stderr)")
+    parser = argparse.ArgumentParser(description=f"{APP_TITLE} tanpa GUI")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('export', parents=[common], help="buat laporan PDF")
+    p.add_argument('-o', '--output', default='{db}_laporan.pdf',
+                   help="path PDF; {db} = nama database, {date} = tanggal (YYYYMMDD)")
+    p.add_argument('--user', default='Sistem', help="nama pembuat di laporan")
+    p.add_argument('--workers', type=int, default=None, help="proses render per laporan")
+    p = sub.add_parser('stats', parents=[common], help="ringkasan statistik")
+    p.add_argument('--json', action='store_true', help="satu baris JSON per database")
+    p.add_argument('--top', type=int, default=5, help="jumlah lokasi yang ditampilkan")
+    p.add_argument('--since', help="hanya survey sejak tanggal ini (YYYY-MM-DD[ HH:MM:SS])")
+    p.add_argument('--until', help="hanya survey sebelum tanggal ini (eksklusif)")
+    p = sub.add_parser('import', parents=[common], help="import CSV/JSON/JSONL")
+    p.add_argument('files', nargs='+')
+    p.add_argument('--owner', default='', help="owner_username untuk baris tanpa owner")
+    sub.add_parser('vacuum', parents=[common], help="padatkan database, bangun ulang indeks dan ringkasan")
+    p = sub.add_parser('locations', parents=[common], help="daftar lokasi atau gabungkan varian ejaan")
+    p.add_argument('--merge', nargs='+', metavar=('TARGET', 'VARIAN'),
+                   help="gabungkan VARIAN (mis. salah ketik) ke lokasi TARGET")
+    p = sub.add_parser('memory', parents=[common], help="ukur memori per baris survey di tabel admin")
+    p.add_argument('--rows', type=int, default=10000)
+    p = sub.add_parser('pdf', parents=[common], help="ukur biaya render PDF per responden")
+    p.add_argument('--rows', type=int, default=1000)
+    p = sub.add_parser('startup', help="ukur waktu start aplikasi (gagal bila regresi)")
+    p.add_argument('--runs', type=int, default=5)
+    p.add_argument('--max-ms', type=float, default=None, help="batas median waktu start")
+    return parser
+
+def cli_run(db_path, args, capture=False):
+    """Jalankan satu perintah untuk satu database; kembalikan (status, stdout, stderr).
+    Output hanya ditampung (capture) di proses pekerja paralel agar tidak bercampur
+    antar database; tanpa capture output langsung tampil dan stdout/stderr kosong."""
+    out, err = io.StringIO(), io.StringIO()
+    with contextlib.ExitStack() as stack:
+        if capture:
+            stack.enter_context(contextlib.redirect_stdout(out))
+            stack.enter_context(contextlib.redirect_stderr(err))
+        if args.command != 'import' and not os.path.exists(db_path):
+            print(f"{db_path}: database tidak ditemukan", file=sys.stderr)
+            status = 1
+        else:
+            db = SimpleDB(db_path)
+            try:
+                status = CLI_COMMANDS[args.command](db, args)
+            except Exception as e:
+                print(f"{db_path}: {e}", file=sys.stderr)
+                status = 1
+            finally:
+                if args.timings:
+                    t = db.timings()
+                    print(f"{db_path}: {t['queries']} query {t['query_time'] * 1000:.0f} ms, "
+                          f"{t['connects']} koneksi {t['connect_time'] * 1000:.0f} ms", file=sys.stderr)
+                db.close()
+    return status, out.getvalue(), err.getvalue()
+
+def cli_startup(args):
+    result = benchmark_startup(args.runs)
+    print(f"startup: median {result['median_ms']:.0f} ms, min {result['min_ms']:.0f} ms "
+          f"({result['runs']} kali); modul berat: {', '.join(result['heavy_modules']) or '-'}")
+    if result['heavy_modules'] or (args.max_ms and result['median_ms'] > args.max_ms):
+        return 1
+    return 0
+
+def cli_main(argv):
+    """python app.py {export,stats,import,vacuum,locations,memory,pdf,startup} [--db PATH ...] [-j N]"""
+    args = cli_parser().parse_args(argv)
+    if args.command == 'startup':
+        return cli_startup(args)
+    databases = args.databases or ['survey_app.db']
+    if args.command == 'export' and len(databases) > 1 and '{db}' not in args.output:
+        print("--output harus memuat {db} bila database lebih dari satu", file=sys.stderr)
+        return 2
+    if args.jobs > 1 and len(databases) > 1:
+        # Paralel per database; render PDF di tiap database cukup satu proses
+        from concurrent.futures import ProcessPoolExecutor
+        if args.command == 'export':
+            args.workers = 1
+        with ProcessPoolExecutor(max_workers=args.jobs) as ex:
+            results = list(ex.map(cli_run, databases, [args] * len(databases), [True] * len(databases)))
+    else:
+        results = [cli_run(path, args) for path in databases]
+    for _, out, err in results:
+        sys.stdout.write(out)
+        sys.stderr.write(err)
+    return max(status for status, _, _ in results)
+
 def main():
+    if len(sys.argv) > 1:
+        sys.exit(cli_main(sys.argv[1:]))
+    load_gui()
     root = tk.Tk()
     try:
         root.iconbitmap('icon.ico')
@@ -1565,6 +3981,9 @@ def main():
     app = SurveyApp(root)
     root.deiconify()
     root.mainloop()
+    app.cancel_tasks()
+    worker_pool().shutdown(wait=True)
+    app.db.close()
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file